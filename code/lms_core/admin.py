@@ -4,6 +4,7 @@ from django.urls import path
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from lms_core.models import Category, Course, CourseMember, CourseContent, Comment, Announcement
+from lms_core.enrollment import COURSE_FULL, ENROLLED, enroll_users
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
@@ -19,9 +20,15 @@ def batch_enroll(request):
         if form.is_valid():
             course = form.cleaned_data['course']
             students = form.cleaned_data['students']
-            for student in students:
-                CourseMember.objects.get_or_create(course_id=course, user_id=student)
-            messages.success(request, "Students enrolled successfully")
+            _, results = enroll_users(course.id, [student.id for student in students])
+            enrolled = sum(status == ENROLLED for _, status in results)
+            full = sum(status == COURSE_FULL for _, status in results)
+            if enrolled:
+                messages.success(request, f"{enrolled} students enrolled successfully")
+            if full:
+                messages.warning(request, f"{full} students were not enrolled, the course is full")
+            if not enrolled and not full:
+                messages.info(request, "The selected students were already enrolled")
             return redirect('admin:index')
     else:
         form = BatchEnrollForm()
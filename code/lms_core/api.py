@@ -1,18 +1,38 @@
-from ninja import NinjaAPI, UploadedFile, File, Form
+from typing import Literal
+from ninja import NinjaAPI, UploadedFile, File, Form, Query
 from ninja.responses import Response
 from lms_core.schema import CourseSchemaOut, CourseMemberOut, CourseSchemaIn
-from lms_core.schema import CourseContentMini, CourseContentFull
-from lms_core.schema import CourseCommentOut, CourseCommentIn
-from lms_core.models import Course, CourseMember, CourseContent, Comment
+from lms_core.schema import CourseContentMini, CourseContentFull, ContentOutlineOut
+from lms_core.schema import CourseCommentOut, CourseCommentIn, CommentFeedOut
+from lms_core.schema import BulkEnrollIn, BulkEnrollOut, CourseAnalyticsOut, SearchOut, AnnouncementOut
+from lms_core.schema import CourseProgressOut, StudentProgressOut
+from lms_core.schema import CompletionIn, CompletionAcceptedOut, CompletionMetricsOut
+from lms_core.enrollment import ENROLLED, enroll_users
+from lms_core.models import Course, CourseMember, CourseContent, Comment, Announcement
+from lms_core.stats import count_of
+from lms_core.outline import nest
+from lms_core.progress import course_progress, user_progress
+from lms_core import completions, search
 from ninja_simple_jwt.auth.views.api import mobile_auth_router
-from ninja_simple_jwt.auth.ninja_auth import HttpJwtAuth
-from ninja.pagination import paginate, PageNumberPagination
+from lms_core.auth import JwtClaimsAuth
+from ninja.decorators import decorate_view
+from ninja.pagination import paginate
+from lms_core.pagination import KeysetPagination
+from lms_core.queryplan import plan, planned
+from lms_core.fieldsets import sparse
+from lms_core.conditional import conditional
+from lms_core.responsecache import cached, catalog_scope, course_scope
+from lms_core.api_async import router as async_router
 
-from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
 
 apiv1 = NinjaAPI()
 apiv1.add_router("/auth/", mobile_auth_router)
-apiAuth = HttpJwtAuth()
+apiv1.add_router("/async/", async_router)
+apiAuth = JwtClaimsAuth()
 
 @apiv1.get("/hello")
 def hello(request):
@@ -20,28 +40,74 @@ def hello(request):
 
 # - paginate list_courses
 @apiv1.get("/courses", response=list[CourseSchemaOut])
-@paginate(PageNumberPagination, page_size=10)
+@decorate_view(cached(catalog_scope))
+@conditional(lambda request: Course.objects.all())
+@sparse(CourseSchemaOut)
+@paginate(KeysetPagination, page_size=10)
+@planned(CourseSchemaOut)
 def list_courses(request):
-    courses = Course.objects.select_related('teacher').all()
+    courses = Course.objects.all()
     return courses
 
+# - search courses, contents and comments
+@apiv1.get("/search", response=SearchOut)
+def search_catalog(request, q: str = Query(..., min_length=2, max_length=200),
+                   kind: Literal['course', 'content', 'comment'] = None, course: int = None,
+                   page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=100)):
+    hits = search.query(q, kind, course, limit=page_size + 1, offset=(page - 1) * page_size)
+    return {
+        "items": hits[:page_size],
+        "next_page": page + 1 if len(hits) > page_size else None,
+    }
+
 # - my courses
 @apiv1.get("/mycourses", auth=apiAuth, response=list[CourseMemberOut])
+@sparse(CourseMemberOut)
+@planned(CourseMemberOut)
 def my_courses(request):
-    user = User.objects.get(id=request.user.id)
-    courses = CourseMember.objects.select_related('user_id', 'course_id').filter(user_id=user)
+    courses = CourseMember.objects.filter(user_id=request.user.id)
     return courses
 
+# - mark contents of my courses complete, written behind in batches
+@apiv1.post("/completions", auth=apiAuth, response={202: CompletionAcceptedOut})
+def record_completions(request, data: CompletionIn):
+    content_ids = set(data.content_ids)
+    if data.content_id is not None:
+        content_ids.add(data.content_id)
+    if not content_ids:
+        return Response({"error": "Sertakan content_id atau content_ids"}, status=400)
+    # one query: which contents exist and which of them are in a course of this user
+    member = CourseMember.objects.filter(course_id=OuterRef('course_id'), user_id=request.user.id)
+    contents = dict(CourseContent.objects.filter(id__in=content_ids)
+                    .values_list('id', Exists(member)))
+    unknown = sorted(content_ids - contents.keys())
+    if unknown:
+        return Response({"error": "Konten tidak ditemukan", "content_ids": unknown}, status=404)
+    content_ids = [content_id for content_id, enrolled in contents.items() if enrolled]
+    depth = completions.buffer.add(request.user.id, content_ids) if content_ids else 0
+    return 202, {"accepted": len(content_ids), "depth": depth}
+
+# - completion buffer metrics of this process
+@apiv1.get("/completions/metrics", auth=apiAuth, response=CompletionMetricsOut)
+def completion_metrics(request):
+    if not request.user.is_staff:
+        return Response({"error": "Hanya staff yang bisa melihat metrik"}, status=403)
+    return completions.buffer.metrics()
+
+# - my progress in every course
+@apiv1.get("/mycourses/progress", auth=apiAuth, response=list[CourseProgressOut])
+def my_progress(request):
+    return user_progress(request.user.id)
+
 # - create course
 @apiv1.post("/courses", auth=apiAuth, response={201:CourseSchemaOut})
 def create_course(request, data: Form[CourseSchemaIn], image: UploadedFile = File(None)):
-    user = User.objects.get(id=request.user.id)
     course = Course(
         name=data.name,
         description=data.description,
         price=data.price,
         image=image,
-        teacher=user
+        teacher_id=request.user.id
     )
 
     if image:
@@ -50,14 +116,37 @@ def create_course(request, data: Form[CourseSchemaIn], image: UploadedFile = Fil
     course.save()
     return 201, course
 
+# - analytics of many courses
+@apiv1.get("/courses/analytics", auth=apiAuth, response=list[CourseAnalyticsOut])
+def courses_analytics(request, ids: list[int] = Query(None, max_length=100), teacher: int = None,
+                      category: int = None):
+    if not ids and teacher is None and category is None:
+        return Response({"error": "Sertakan ids, teacher atau category"}, status=400)
+    courses = Course.objects.all()
+    if not request.user.is_staff:
+        courses = courses.filter(teacher_id=request.user.id)
+    if ids:
+        courses = courses.filter(id__in=ids)
+    if teacher is not None:
+        courses = courses.filter(teacher_id=teacher)
+    if category is not None:
+        courses = courses.filter(category_id=category)
+    # one round trip: a correlated count per column instead of a join fan-out
+    return courses.order_by('id').values('name', course_id=F('id')).annotate(
+        members_count=count_of(CourseMember, 'course_id'),
+        contents_count=count_of(CourseContent, 'course_id'),
+        comments_count=count_of(Comment, 'content_id__course_id'),
+        approved_comments_count=count_of(Comment, 'content_id__course_id', is_approved=True),
+    )
+
 # - update course
 @apiv1.post("/courses/{course_id}", auth=apiAuth, response=CourseSchemaOut)
 def update_course(request, course_id: int, data: Form[CourseSchemaIn], image: UploadedFile = File(None)):
-    if request.user.id != Course.objects.get(id=course_id).teacher.id:
+    course = Course.objects.get(id=course_id)
+    if request.user.id != course.teacher_id:
         message = {"error": "Anda tidak diijinkan update course ini"}
         return Response(message, status=401)
     
-    course = Course.objects.get(id=course_id)
     course.name = data.name
     course.description = data.description
     course.price = data.price
@@ -68,49 +157,117 @@ def update_course(request, course_id: int, data: Form[CourseSchemaIn], image: Up
 
 # - detail course
 @apiv1.get("/courses/{course_id}", response=CourseSchemaOut)
+@decorate_view(cached(course_scope))
+@conditional(lambda request, course_id: Course.objects.filter(id=course_id))
 def detail_course(request, course_id: int):
-    course = Course.objects.select_related('teacher').get(id=course_id)
+    course = plan(Course.objects.all(), CourseSchemaOut).get(id=course_id)
     return course
 
+# - active announcements of a course
+@apiv1.get("/courses/{course_id}/announcements", response=list[AnnouncementOut])
+@decorate_view(cached(course_scope,
+                      timeout=lambda request, course_id: Announcement.seconds_to_next_change(course_id)))
+def list_announcements(request, course_id: int):
+    announcements = Announcement.active(course_id, timezone.now())
+    return announcements
+
 # - list content course
 @apiv1.get("/courses/{course_id}/contents", response=list[CourseContentMini])
+@decorate_view(cached(course_scope))
+@conditional(lambda request, course_id: CourseContent.objects.filter(course_id=course_id),
+             'updated_at', 'course_id__updated_at')
+@sparse(CourseContentMini)
+@planned(CourseContentMini)
 def list_content_course(request, course_id: int):
     contents = CourseContent.objects.filter(course_id=course_id)
     return contents
 
+# - outline course: the whole content tree, in order, from one query
+@apiv1.get("/courses/{course_id}/outline", response=list[ContentOutlineOut])
+@decorate_view(cached(course_scope))
+def outline_course(request, course_id: int):
+    contents = CourseContent.objects.filter(course_id=course_id).order_by('path') \
+        .only('id', 'name', 'parent_id', 'scheduled_start_time', 'scheduled_end_time')
+    return nest(contents)
+
+# - subtree content: one content with all its descendants
+@apiv1.get("/courses/{course_id}/contents/{content_id}/subtree", response=ContentOutlineOut)
+@decorate_view(cached(course_scope))
+def subtree_content(request, course_id: int, content_id: int):
+    path = CourseContent.objects.filter(id=content_id, course_id=course_id).values_list('path', flat=True).first()
+    if not path:
+        return Response({"error": "Konten tidak ditemukan"}, status=404)
+    contents = CourseContent.subtree(course_id, path).order_by('path') \
+        .only('id', 'name', 'parent_id', 'scheduled_start_time', 'scheduled_end_time')
+    return nest(contents)[0]
+
 # - detail content course
+# the content is looked up in the course of the url, so the course scope covers the cached response
 @apiv1.get("/courses/{course_id}/contents/{content_id}", response=CourseContentFull)
+@decorate_view(cached(course_scope))
+@conditional(lambda request, course_id, content_id: CourseContent.objects.filter(id=content_id, course_id=course_id),
+             'updated_at', 'course_id__updated_at')
 def detail_content_course(request, course_id: int, content_id: int):
-    content = CourseContent.objects.get(id=content_id)
+    content = plan(CourseContent.objects.all(), CourseContentFull).filter(id=content_id, course_id=course_id).first()
+    if content is None:
+        return Response({"error": "Konten tidak ditemukan"}, status=404)
     return content
 
+# - progress of every student in a course
+@apiv1.get("/courses/{course_id}/progress", auth=apiAuth, response=list[StudentProgressOut])
+def course_students_progress(request, course_id: int):
+    teacher_id = Course.objects.filter(id=course_id).values_list('teacher_id', flat=True).first()
+    if teacher_id is None:
+        return Response({"error": "Course tidak ditemukan"}, status=404)
+    if request.user.id != teacher_id and not request.user.is_staff:
+        return Response({"error": "Anda tidak diijinkan melihat progress course ini"}, status=403)
+    return course_progress(course_id)
+
 # - enroll course
 @apiv1.post("/courses/{course_id}/enroll", auth=apiAuth, response=CourseMemberOut)
 def enroll_course(request, course_id: int):
-    user = User.objects.get(id=request.user.id)
     course = Course.objects.get(id=course_id)
-    course_member = CourseMember(course_id=course, user_id=user, roles="std")
-    course_member.save()
+    course_member = CourseMember(course_id=course, user_id=request.user.instance, roles="std")
+    try:
+        course_member.save()
+    except ValidationError:
+        return Response({"error": "Course sudah penuh"}, status=400)
+    except IntegrityError:
+        return Response({"error": "Anda sudah terdaftar di course ini"}, status=400)
     # print(course_member)
     return course_member
 
+# - bulk enroll
+@apiv1.post("/courses/{course_id}/enroll/bulk", auth=apiAuth, response=BulkEnrollOut)
+def bulk_enroll_course(request, course_id: int, data: BulkEnrollIn):
+    teacher_id = Course.objects.filter(id=course_id).values_list('teacher_id', flat=True).first()
+    if teacher_id is None:
+        return Response({"error": "Course tidak ditemukan"}, status=404)
+    if teacher_id != request.user.id and not request.user.is_staff:
+        return Response({"error": "Anda tidak diijinkan mendaftarkan siswa di course ini"}, status=403)
+
+    course, results = enroll_users(course_id, data.user_ids, data.roles)
+    return {
+        "course_id": course.id,
+        "enrolled": sum(status == ENROLLED for _, status in results),
+        "results": [{"user_id": user_id, "status": status} for user_id, status in results],
+    }
+
 # - list content comment
-@apiv1.get("/contents/{content_id}/comments", auth=apiAuth, response=list[CourseContentMini])
+@apiv1.get("/contents/{content_id}/comments", auth=apiAuth, response=list[CommentFeedOut])
+@paginate(KeysetPagination, page_size=20, count=False)
 def list_content_comment(request, content_id: int):
-    comments = CourseContent.objects.filter(course_id=content_id)
-    return comments
+    return Comment.feed(content_id)
 
 # - create content comment
 @apiv1.post("/contents/{content_id}/comments", auth=apiAuth, response={201: CourseCommentOut})
 def create_content_comment(request, content_id: int, data: CourseCommentIn):
-    user = User.objects.get(id=request.user.id)
     content = CourseContent.objects.get(id=content_id)
-
-    if not content.course_id.is_member(user):
+    member = CourseMember.objects.filter(course_id=content.course_id_id, user_id=request.user.id).first()
+    if member is None:
         message =  {"error": "You are not authorized to create comment in this content"}
         return Response(message, status=401)
     
-    member = CourseMember.objects.get(course_id=content.course_id, user_id=user)
     
     comment = Comment(
         content_id=content,
@@ -0,0 +1,77 @@
+"""
+Async variants of the read-heavy api/v1 endpoints, mounted under /api/v1/async/.
+
+Under ASGI these views wait on the database without holding a worker
+thread each; under WSGI they still work, Django runs them in an event loop
+per request.
+"""
+from django.http import Http404
+from django.utils import timezone
+from ninja import Router
+from ninja.pagination import paginate
+
+from lms_core.auth import JwtClaimsAuth
+from lms_core.models import Announcement, Comment, Course, CourseContent, CourseStats
+from lms_core.pagination import KeysetPagination
+from lms_core.queryplan import plan
+from lms_core.schema import (AnnouncementOut, CommentFeedOut, CourseContentFull, CourseContentMini,
+                             CourseSchemaOut, CourseStatsOut)
+
+router = Router(tags=["async"])
+apiAuth = JwtClaimsAuth()
+
+
+async def aget_or_404(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        raise Http404
+
+
+@router.get("/courses", response=list[CourseSchemaOut])
+@paginate(KeysetPagination, page_size=10)
+async def alist_courses(request):
+    return plan(Course.objects.all(), CourseSchemaOut)
+
+
+@router.get("/courses/{course_id}", response=CourseSchemaOut)
+async def adetail_course(request, course_id: int):
+    return await aget_or_404(plan(Course.objects.all(), CourseSchemaOut), id=course_id)
+
+
+@router.get("/courses/{course_id}/contents", response=list[CourseContentMini])
+async def alist_content_course(request, course_id: int):
+    contents = plan(CourseContent.objects.filter(course_id=course_id), CourseContentMini)
+    return [content async for content in contents]
+
+
+@router.get("/courses/{course_id}/contents/{content_id}", response=CourseContentFull)
+async def adetail_content_course(request, course_id: int, content_id: int):
+    return await aget_or_404(plan(CourseContent.objects.all(), CourseContentFull),
+                             id=content_id, course_id=course_id)
+
+
+@router.get("/contents/{content_id}/comments", auth=apiAuth, response=list[CommentFeedOut])
+@paginate(KeysetPagination, page_size=20, count=False)
+async def alist_content_comment(request, content_id: int):
+    return Comment.feed(content_id)
+
+
+@router.get("/courses/{course_id}/announcements", response=list[AnnouncementOut])
+async def alist_announcements(request, course_id: int):
+    now = timezone.now()
+    announcements = plan(Announcement.active(course_id, now), AnnouncementOut)
+    return [announcement async for announcement in announcements]
+
+
+@router.get("/courses/{course_id}/analytics", response=CourseStatsOut)
+async def acourse_analytics(request, course_id: int):
+    members = await Course.objects.filter(id=course_id).values_list('enrolled_count', flat=True).afirst()
+    if members is None:
+        raise Http404
+    stats = await CourseStats.objects.filter(course_id=course_id).afirst() or CourseStats()
+    return {
+        'members_count': members,
+        'contents_count': stats.contents,
+        'comments_count': stats.comments,
+    }
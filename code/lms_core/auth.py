@@ -0,0 +1,63 @@
+"""
+JWT auth for api/v1 that trusts the verified token claims.
+
+`HttpJwtAuth` from ninja_simple_jwt parses `jwt-signing.pub` again for every
+request and the views then read the user row again by id. `JwtClaimsAuth`
+parses the key once and sets `request.user` to a `ClaimsUser` built from
+the claims; handlers that really need the `User` row use its `instance`.
+Claims such as `is_staff` are as fresh as the access token (15 minutes).
+"""
+from functools import cached_property, lru_cache
+
+import jwt
+from django.contrib.auth.models import User
+from ninja.errors import AuthenticationError
+from ninja.security import HttpBearer
+from ninja_simple_jwt.auth.token_user import TokenUser
+from ninja_simple_jwt.jwt.key_retrieval import InMemoryJwtKeyPair
+from ninja_simple_jwt.jwt.token_operations import TokenTypes
+from ninja_simple_jwt.settings import ninja_simple_jwt_settings
+
+
+@lru_cache(maxsize=4)
+def verifying_key(pem, algorithm):
+    """The parsed public key; keyed by the PEM so a rotated key is parsed again."""
+    return jwt.get_algorithm_by_name(algorithm).prepare_key(pem)
+
+
+def decode_access_token(token):
+    algorithm = ninja_simple_jwt_settings.JWT_ALGORITHM
+    claims = jwt.decode(token, verifying_key(InMemoryJwtKeyPair.public_key, algorithm), algorithms=[algorithm],
+                        leeway=ninja_simple_jwt_settings.JWT_LEEWAY,
+                        options={'require': ['exp', 'jti', 'token_type']})
+    if claims['token_type'] != TokenTypes.ACCESS:
+        raise jwt.InvalidTokenError("Incorrect token type in JWT.")
+    return claims
+
+
+class ClaimsUser(TokenUser):
+    """The authenticated user as the token describes it, usable in ORM filters like a User."""
+
+    def __init__(self, claims):
+        super().__init__(user_id=claims['user_id'], email=claims.get('email'), roles=claims.get('roles', []))
+        self.username = claims.get('username', '')
+        self.is_staff = bool(claims.get('is_staff'))
+        self.is_superuser = bool(claims.get('is_superuser'))
+
+    @cached_property
+    def instance(self):
+        """The User row, queried on first access."""
+        return User.objects.get(pk=self.id)
+
+
+class JwtClaimsAuth(HttpBearer):
+
+    def authenticate(self, request, token):
+        try:
+            claims = decode_access_token(token)
+        except jwt.PyJWTError as e:
+            raise AuthenticationError(status_code=401, message=f"Invalid or expired token: {e}") from e
+        if not claims.get('user_id'):
+            raise AuthenticationError(status_code=401, message="Invalid token: missing user_id")
+        request.user = ClaimsUser(claims)
+        return request.user
@@ -0,0 +1,76 @@
+"""
+Fast insert path for the bulk importer.
+
+On PostgreSQL rows are streamed through `COPY ... FROM STDIN`, elsewhere
+they go through one `executemany` per batch. Either way no model signals
+run and no primary keys are handed back, just like `bulk_create` on a
+backend without RETURNING.
+"""
+import io
+
+from django.core.management.color import no_style
+from django.db import connection
+
+BATCH_SIZE = 5000
+
+
+def _columns(model, objs):
+    # the pk column is only sent when every row carries an explicit id
+    with_pk = all(obj.pk is not None for obj in objs)
+    return [field for field in model._meta.concrete_fields if with_pk or not field.primary_key]
+
+
+def _values(objs, fields):
+    for obj in objs:
+        yield [field.get_db_prep_save(field.pre_save(obj, add=True), connection) for field in fields]
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(','.join(_csv_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    raw = cursor.cursor
+    if hasattr(raw, 'copy_expert'):
+        raw.copy_expert(sql, buffer)
+    else:
+        # psycopg 3
+        with raw.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+def insert(model, objs, batch_size=BATCH_SIZE):
+    """Insert unsaved model instances, returns the number of rows written."""
+    objs = list(objs)
+    if not objs:
+        return 0
+    fields = _columns(model, objs)
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = [quote(field.column) for field in fields]
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            rows = _values(objs[start:start + batch_size], fields)
+            if connection.vendor == 'postgresql':
+                _copy(cursor, table, columns, rows)
+            else:
+                placeholders = ', '.join(['%s'] * len(columns))
+                cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                                   list(rows))
+    return len(objs)
+
+
+def reset_sequences(*models):
+    """Move id sequences past rows that were inserted with explicit ids."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
@@ -0,0 +1,192 @@
+"""
+Write-behind buffer for content completion events.
+
+Players report completions far more often than they change anything:
+instead of one INSERT per request, `buffer.add` queues (user, content)
+pairs in memory and a background thread writes them with one
+`bulk_create(ignore_conflicts=True)` once `COMPLETION_BUFFER_SIZE` events
+are waiting or the oldest has waited `COMPLETION_FLUSH_SECONDS`. With a
+flush interval of 0 every `add` writes through in the caller's thread.
+
+Each process has its own buffer, drained when the process exits; events
+still queued when it is killed outright are lost, like a request that
+never arrived, and the player sends them again.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connection, transaction
+
+from lms_core import stats
+from lms_core.models import ContentCompletion, CourseContent
+
+logger = logging.getLogger(__name__)
+
+
+def _insert_returning(objs):
+    """INSERT ... ON CONFLICT DO NOTHING, returning the (user id, content id) pairs actually inserted."""
+    fields = [field for field in ContentCompletion._meta.concrete_fields if not field.primary_key]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    inserted = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), 500):
+            batch = objs[start:start + 500]
+            params = [field.get_db_prep_save(field.pre_save(obj, add=True), connection)
+                      for obj in batch for field in fields]
+            cursor.execute(f"INSERT INTO {quote(ContentCompletion._meta.db_table)} ({columns}) "
+                           f"VALUES {', '.join([row] * len(batch))} ON CONFLICT DO NOTHING "
+                           f"RETURNING {quote('user_id')}, {quote('content_id')}", params)
+            inserted.update(cursor.fetchall())
+    return inserted
+
+
+def write(pairs):
+    """Insert the (user id, content id) pairs not stored yet; returns the rows written."""
+    pairs = set(pairs)
+    contents = dict(CourseContent.objects.filter(id__in={content for _, content in pairs})
+                    .values_list('id', 'course_id'))
+    users = set(User.objects.filter(id__in={user for user, _ in pairs}).values_list('id', flat=True))
+    with transaction.atomic():
+        existing = set(ContentCompletion.objects.filter(user_id__in=users, content_id__in=contents)
+                       .values_list('user_id', 'content_id'))
+        new = [ContentCompletion(user_id=user, content_id=content, course_id=contents[content])
+               for user, content in sorted(pairs - existing) if user in users and content in contents]
+        if connection.vendor == 'postgresql':
+            # a concurrent writer may still win a pair: count only the rows this INSERT wrote
+            inserted = _insert_returning(new)
+            new = [obj for obj in new if (obj.user_id, obj.content_id) in inserted]
+        else:
+            # SQLite lets one writer in at a time, a pair read as missing above is still missing;
+            # should one turn up anyway the IntegrityError keeps the batch for the next flush
+            ContentCompletion.objects.bulk_create(new, batch_size=500)
+        stats.count_created(new)
+    return len(new)
+
+
+class CompletionBuffer:
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pending = set()
+        self.oldest = None
+        self.thread = None
+        self.stopping = False
+        self.flushes = self.written = self.failures = 0
+        self.last_flush_ms = self.max_flush_ms = 0.0
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'COMPLETION_BUFFER_SIZE', 500)
+
+    @property
+    def max_delay(self):
+        return getattr(settings, 'COMPLETION_FLUSH_SECONDS', 1.0)
+
+    def add(self, user_id, content_ids):
+        """Queue completions of `user_id`; returns the number of events waiting."""
+        with self.cond:
+            if not self.pending:
+                self.oldest = time.monotonic()
+            self.pending.update((user_id, content_id) for content_id in content_ids)
+            depth = len(self.pending)
+            if self.max_delay and not self.stopping:
+                self.start()
+                # wakes the thread to flush now or to time the first event
+                self.cond.notify()
+                return depth
+        self.flush()
+        return 0
+
+    def take(self):
+        with self.cond:
+            batch, self.pending, self.oldest = self.pending, set(), None
+        return batch
+
+    def flush(self):
+        """Write everything queued now, in the caller's thread; returns the rows written."""
+        batch = self.take()
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        try:
+            written = write(batch)
+        except Exception:
+            # keep the events for the next flush rather than dropping them
+            with self.cond:
+                self.failures += 1
+                self.pending |= batch
+                self.oldest = self.oldest or time.monotonic()
+            raise
+        elapsed = (time.perf_counter() - started) * 1000
+        with self.cond:
+            self.flushes += 1
+            self.written += written
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        return written
+
+    def due(self):
+        """Seconds until the next flush is due, 0 when it is due now, None when nothing is queued."""
+        if not self.pending:
+            return None
+        if len(self.pending) >= self.max_size:
+            return 0
+        return max(self.oldest + self.max_delay - time.monotonic(), 0)
+
+    def start(self):
+        with self.cond:
+            if self.thread is None or not self.thread.is_alive():
+                self.stopping = False
+                self.thread = threading.Thread(target=self.run, name='completion-buffer', daemon=True)
+                self.thread.start()
+                atexit.register(self.stop)
+
+    def run(self):
+        try:
+            while True:
+                with self.cond:
+                    while not self.stopping and self.due() != 0:
+                        self.cond.wait(self.due())
+                    stopping = self.stopping
+                close_old_connections()
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("completion flush failed, %d events kept", len(self.pending))
+                    if not stopping:
+                        time.sleep(self.max_delay)
+                if stopping:
+                    return
+        finally:
+            connection.close()
+
+    def stop(self, timeout=10):
+        """Stop the thread after a last flush of everything queued."""
+        with self.cond:
+            thread, self.stopping = self.thread, True
+            self.cond.notify()
+        if thread is not None:
+            thread.join(timeout)
+        atexit.unregister(self.stop)
+
+    def metrics(self):
+        with self.cond:
+            return {
+                'depth': len(self.pending),
+                'oldest_ms': round((time.monotonic() - self.oldest) * 1000, 3) if self.pending else 0.0,
+                'flushes': self.flushes,
+                'written': self.written,
+                'failures': self.failures,
+                'last_flush_ms': round(self.last_flush_ms, 3),
+                'max_flush_ms': round(self.max_flush_ms, 3),
+                'running': bool(self.thread and self.thread.is_alive()),
+            }
+
+
+buffer = CompletionBuffer()
@@ -0,0 +1,38 @@
+"""
+Conditional GET for the public api/v1 reads.
+
+The validator of a response is the newest `updated_at` of the rows it is
+built from plus their count, the count catches deletes. Both come from one
+aggregate query, and a matching `If-None-Match` / `If-Modified-Since`
+answers 304 before the view runs.
+"""
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+from ninja.decorators import decorate_view
+
+
+def conditional(rows, *timestamps):
+    """
+    `rows(request, **path_params)` returns the queryset behind the response,
+    `timestamps` are the datetime fields (default `updated_at`) whose newest
+    value dates it.
+    """
+    timestamps = timestamps or ('updated_at',)
+
+    def state(request, **kwargs):
+        if not hasattr(request, '_conditional_state'):
+            values = rows(request, **kwargs).aggregate(
+                count=Count('pk'), **{f'last_{num}': Max(field) for num, field in enumerate(timestamps)})
+            count = values.pop('count')
+            last_modified = max(filter(None, values.values()), default=None)
+            request._conditional_state = count, last_modified
+        return request._conditional_state
+
+    def etag(request, **kwargs):
+        count, last_modified = state(request, **kwargs)
+        return f"{count}-{last_modified.timestamp() if last_modified else 0}"
+
+    def last_modified(request, **kwargs):
+        return state(request, **kwargs)[1]
+
+    return decorate_view(condition(etag_func=etag, last_modified_func=last_modified))
@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from lms_core import stats
+from lms_core.models import Course, CourseMember
+
+ENROLLED = 'enrolled'
+ALREADY_ENROLLED = 'already_enrolled'
+DUPLICATE = 'duplicate'
+USER_NOT_FOUND = 'user_not_found'
+COURSE_FULL = 'course_full'
+
+INSERT_ATTEMPTS = 3
+
+
+def enroll_users(course_id, user_ids, roles='std'):
+    """
+    Enroll `user_ids` into a course in one transaction, in list order until
+    the course is full. Returns (course, [(user_id, status)]), a constant
+    number of queries however many users are passed.
+
+    Raises Course.DoesNotExist.
+    """
+    with transaction.atomic():
+        # the lock serializes concurrent enrollments, so the capacity check holds
+        course = Course.objects.select_for_update().get(id=course_id)
+        existing = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        remaining = course.max_students - course.enrolled_count
+
+        for attempt in range(INSERT_ATTEMPTS):
+            enrolled = set(CourseMember.objects.filter(course_id=course, user_id__in=existing)
+                           .values_list('user_id', flat=True))
+            results, seen, new = [], set(), []
+            for user_id in user_ids:
+                if user_id in seen:
+                    status = DUPLICATE
+                elif user_id not in existing:
+                    status = USER_NOT_FOUND
+                elif user_id in enrolled:
+                    status = ALREADY_ENROLLED
+                elif len(new) >= remaining:
+                    status = COURSE_FULL
+                else:
+                    status = ENROLLED
+                    new.append(CourseMember(course_id=course, user_id_id=user_id, roles=roles))
+                seen.add(user_id)
+                results.append((user_id, status))
+            if not new:
+                break
+            try:
+                with transaction.atomic():
+                    CourseMember.objects.bulk_create(new)
+                break
+            except IntegrityError:
+                # a writer that does not take the course lock (the importer) enrolled one of
+                # them in between; read the members again and report it as already enrolled
+                if attempt == INSERT_ATTEMPTS - 1:
+                    raise
+
+        # bulk_create skips CourseMember.save(), so the seats are claimed here
+        if new:
+            Course.objects.filter(id=course.id).update(enrolled_count=F('enrolled_count') + len(new))
+            course.enrolled_count += len(new)
+            stats.count_created(new)
+    return course, results
+
+
+def reconcile_enrolled_counts(course_ids=None):
+    """
+    Repair `Course.enrolled_count` from the member rows in one UPDATE, for
+    writes that skip CourseMember.save() (bulk imports, raw SQL). Returns
+    the number of courses that had drifted.
+    """
+    actual = stats.count_of(CourseMember, 'course_id')
+    courses = Course.objects.all() if course_ids is None else Course.objects.filter(id__in=course_ids)
+    return courses.exclude(enrolled_count=actual).update(enrolled_count=actual)
@@ -0,0 +1,126 @@
+"""
+Sparse fieldsets for the list endpoints of api/v1.
+
+`?fields=id,name` returns only those columns, a relation that is listed
+comes back as its id. `?expand=course_id` side-loads the related objects
+once into `included`, keyed by id, instead of repeating them in every
+item. Without either parameter the endpoint answers with its full schema.
+"""
+from functools import lru_cache, wraps
+from typing import Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from django.http import HttpResponse
+from ninja import Query, Schema
+from ninja.errors import HttpError
+from ninja.responses import Response
+from ninja.utils import contribute_operation_args
+from pydantic import create_model
+
+from lms_core.queryplan import inner_schema, plan
+
+
+class FieldsetInput(Schema):
+    fields: Optional[str] = None
+    expand: Optional[str] = None
+
+
+@lru_cache
+def _subset(schema, names):
+    """A schema with just the plain fields `names` of `schema`."""
+    return create_model(f'{schema.__name__}Sparse', __base__=Schema,
+                        **{name: (schema.model_fields[name].annotation, ...) for name in names})
+
+
+class Fieldset:
+
+    def __init__(self, schema, fields=None, expand=None):
+        self.schema = schema
+        model_fields = schema.model_fields
+        names = _split(fields) or list(model_fields)
+        self.expand = _split(expand)
+        unknown = [name for name in names + self.expand if name not in model_fields]
+        if unknown:
+            raise HttpError(400, f"Field tidak dikenal: {', '.join(unknown)}")
+        self.names = list(dict.fromkeys(names + self.expand))
+        self.nested = {name: inner_schema(model_fields[name].annotation)[0] for name in self.names}
+        self.relations = None
+
+    def resolve(self, model):
+        """The requested columns of `model`; relations stay as their foreign key."""
+        columns, self.relations = [], {}
+        for name in self.names:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise HttpError(400, f"Field {name} tidak bisa dipilih")
+            if not field.concrete or field.many_to_many:
+                raise HttpError(400, f"Field {name} tidak bisa dipilih")
+            if field.is_relation:
+                self.relations[name] = field
+            elif name in self.expand:
+                raise HttpError(400, f"Field {name} bukan relasi")
+            columns.append(name)
+        return columns
+
+    def narrow(self, queryset):
+        model = queryset.model
+        columns = self.resolve(model)
+        # the ordering columns are read again by the paginator
+        ordering = [key.lstrip('-') for key in queryset.query.order_by or model._meta.ordering
+                    if isinstance(key, str)]
+        return queryset.select_related(None).prefetch_related(None).only(*columns, *ordering)
+
+    def render(self, objs):
+        objs = list(objs)
+        if not objs:
+            return [], {name: {} for name in self.expand}
+        if self.relations is None:
+            self.resolve(type(objs[0]))
+        plain = tuple(name for name in self.names if name not in self.relations)
+        subset = _subset(self.schema, plain)
+        items = []
+        for obj in objs:
+            item = subset.from_orm(obj).model_dump()
+            for name, field in self.relations.items():
+                item[name] = getattr(obj, field.attname)
+            items.append(item)
+
+        included = {}
+        for name in self.expand:
+            field = self.relations[name]
+            ids = {item[name] for item in items if item[name] is not None}
+            related = plan(field.related_model._default_manager.filter(pk__in=ids), self.nested[name])
+            included[name] = {str(obj.pk): self.nested[name].from_orm(obj).model_dump() for obj in related}
+        return items, included
+
+
+def _split(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def sparse(schema):
+    """
+    View decorator for `?fields=` and `?expand=`, placed right below the route
+    decorator. The view's queryset is narrowed by `@planned` further down.
+    """
+    schema, _ = inner_schema(schema)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, ninja_fieldset=None, **kwargs):
+            if ninja_fieldset is None or not (ninja_fieldset.fields or ninja_fieldset.expand):
+                return view(request, *args, **kwargs)
+            request.fieldset = Fieldset(schema, ninja_fieldset.fields, ninja_fieldset.expand)
+            result = view(request, *args, **kwargs)
+            if isinstance(result, HttpResponse):
+                return result
+            # paginated views answer with a dict around the items
+            page = dict(result) if isinstance(result, dict) else {'items': result}
+            page['items'], page['included'] = request.fieldset.render(page['items'])
+            return Response(page)
+
+        wrapper._ninja_contribute_args = list(getattr(view, '_ninja_contribute_args', []))
+        contribute_operation_args(wrapper, 'ninja_fieldset', FieldsetInput, Query(...))
+        return wrapper
+    return decorator
@@ -0,0 +1,700 @@
+"""
+Bulk importer for the csv_data/ seed files.
+
+Rows in the source files reference each other by their 1-based position:
+course-data.csv `teacher` and member/comment `user_id` point at rows of
+user-data.csv, `course_id` at rows of course-data.csv and `content_id` at
+rows of contents.json (also an optional `parent_id` there). Courses, contents
+and comments are created with that position as their primary key while it is
+free, users are matched on username. The primary key every row went to is
+kept on its ImportRecord, and references and updates go through that map, so
+they never reach rows created elsewhere. The optional completions.json holds
+`content_id`/`user_id` pairs.
+
+Stage functions take `(position, row)` pairs, see `numbered()`; update
+functions take `(position, row, primary key)` triples of rows imported before.
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from lms_core import bulkload
+from lms_core.models import (Course, CourseMember, CourseContent, Comment, ContentCompletion,
+                             ImportCheckpoint, ImportRecord)
+
+BATCH_SIZE = 1000
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        yield from csv.DictReader(csvfile)
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# what may follow a value in an array; anything else after a number means it was cut short
+_VALUE_END = frozenset(' \t\n\r,]')
+
+
+def _decode_error(msg, text, pos, offset=0, lines=0, column=0):
+    """JSONDecodeError for `text[pos]`, placed in the file by what was read before `text`."""
+    error = json.JSONDecodeError(msg, text, pos)
+    if '\n' not in text[:pos]:
+        error.colno += column
+    error.pos += offset
+    error.lineno += lines
+    error.args = (f"{msg}: line {error.lineno} column {error.colno} (char {error.pos})",)
+    return error
+
+
+class _Chunks:
+    """The text of a file read `chunk_size` characters at a time, dropping what was consumed."""
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+        # where `text` starts in the file
+        self.offset = self.lines = self.column = 0
+
+    def read(self):
+        """Append the next chunk; False at the end of the file."""
+        consumed = self.text[:self.pos]
+        newlines = consumed.count('\n')
+        self.column = len(consumed) - consumed.rfind('\n') - 1 if newlines else self.column + len(consumed)
+        self.lines += newlines
+        self.offset += self.pos
+        chunk = self.file.read(self.chunk_size)
+        self.eof = not chunk
+        self.text, self.pos = self.text[self.pos:] + chunk, 0
+        return not self.eof
+
+    def peek(self):
+        """Skip whitespace and return the next character, '' at the end of the file."""
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self.read():
+                return self.text[self.pos:self.pos + 1]
+
+    def decode(self, decoder):
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+                # a value running up to the end of the text may be cut short, and a number
+                # cut after '.', 'e' or a sign decodes as its leading digits
+                if self.eof or end < len(self.text) and self.text[end] in _VALUE_END:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as exc:
+                if self.eof:
+                    raise self.error(exc.msg, exc.pos) from None
+            self.read()
+
+    def error(self, msg, pos=None):
+        return _decode_error(msg, self.text, self.pos if pos is None else pos,
+                             self.offset, self.lines, self.column)
+
+
+def read_json(path, chunk_size=1 << 16):
+    """
+    Yield the rows of a JSON array or NDJSON file one at a time.
+
+    The file is decoded incrementally from fixed-size chunks, so memory use
+    does not grow with the number of rows. Raises json.JSONDecodeError with
+    the position in the file when it is not valid JSON.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as jsonfile:
+        chunks = _Chunks(jsonfile, chunk_size)
+        if chunks.peek() != '[':
+            jsonfile.seek(0)
+            offset = 0
+            for lines, line in enumerate(jsonfile):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        raise _decode_error(exc.msg, line, exc.pos, offset, lines) from None
+                offset += len(line)
+            return
+
+        chunks.pos += 1
+        if chunks.peek() == ']':
+            chunks.pos += 1
+        else:
+            while True:
+                chunks.peek()
+                yield chunks.decode(decoder)
+                delimiter = chunks.peek()
+                if delimiter not in (',', ']'):
+                    raise chunks.error("Expecting ',' delimiter")
+                chunks.pos += 1
+                if delimiter == ']':
+                    break
+        if chunks.peek():
+            raise chunks.error("Extra data")
+
+
+def numbered(rows):
+    return enumerate(rows, start=1)
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class StageResult:
+    def __init__(self, name):
+        self.name = name
+        self.read = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        # positions of rows whose references could not be resolved
+        self.unresolved = set()
+        # primary keys of the rows created, by position
+        self.object_ids = {}
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    @property
+    def changed(self):
+        return bool(self.created or self.updated)
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        updated = f", {self.updated} updated" if self.updated else ""
+        return (f"{self.name}: {self.read} read, {self.created} created{updated}, {self.skipped} skipped "
+                f"in {self.seconds:.2f}s ({self.rows_per_second:.0f} rows/s)")
+
+
+class ImportContext:
+    """
+    Foreign key maps, each loaded with one query the first time a stage needs
+    it, and what the stages wrote, so the follow-up steps redo only that.
+    """
+
+    def __init__(self, user_rows):
+        self.user_rows = user_rows
+        # courses whose content tree got new or changed rows
+        self.content_trees = set()
+        # ids of the searchable rows written, by model
+        self.documents = defaultdict(set)
+        # courses and users whose counted rows (members, contents, comments, ...) changed
+        self.counted_courses = set()
+        self.counted_users = set()
+        # highest primary key handed out so far, by model
+        self.top_ids = {}
+
+    @cached_property
+    def user_ids(self):
+        """Map source user ids (row positions) to database primary keys."""
+        usernames = {num: row['username'] for num, row in numbered(self.user_rows)}
+        pks = dict(User.objects.filter(username__in=usernames.values()).values_list('username', 'id'))
+        return {num: pks[username] for num, username in usernames.items() if username in pks}
+
+    def imported(self, source, model):
+        """Map the positions of a source file to the rows imported from them that still exist."""
+        records = ImportRecord.objects.filter(source=source, object_id__in=model.objects.values('pk'))
+        return {int(key): pk for key, pk in records.values_list('key', 'object_id')}
+
+    @cached_property
+    def course_ids(self):
+        return self.imported('courses', Course)
+
+    @cached_property
+    def content_ids(self):
+        return self.imported('contents', CourseContent)
+
+    @cached_property
+    def content_courses(self):
+        return dict(CourseContent.objects.values_list('id', 'course_id'))
+
+    @cached_property
+    def member_ids(self):
+        return {(course, user): pk for pk, course, user
+                in CourseMember.objects.values_list('id', 'course_id', 'user_id')}
+
+    @cached_property
+    def member_pairs(self):
+        return set(self.member_ids)
+
+    def user(self, source_id):
+        return self.user_ids.get(int(source_id))
+
+    def course(self, source_id):
+        return self.course_ids.get(int(source_id))
+
+    def content(self, source_id):
+        return self.content_ids.get(int(source_id)) if source_id else None
+
+    def allocate(self, model, positions):
+        """
+        Primary keys for rows created from `positions`: the position itself while
+        no row has it, otherwise the next one past the highest id.
+        """
+        taken = set(model.objects.filter(pk__in=positions).values_list('pk', flat=True))
+        if model not in self.top_ids:
+            self.top_ids[model] = model.objects.aggregate(top=Max('pk'))['top'] or 0
+        pks = {}
+        for num in positions:
+            pk = self.top_ids[model] + 1 if num in taken else num
+            taken.add(pk)
+            self.top_ids[model] = max(self.top_ids[model], pk)
+            pks[num] = pk
+        return pks
+
+
+def _init_hash_worker(settings_module):
+    # spawned workers (macOS/Windows) start without a configured Django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def hash_pool(workers=None):
+    """Process pool for PBKDF2; returns None when hashing should stay in-process."""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker,
+                               initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'simplelms.settings'),))
+
+
+def hash_passwords(passwords, pool=None):
+    """Hash a batch of raw passwords, lazily when a pool is given."""
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    return pool.map(make_password, passwords, chunksize=max(1, len(passwords) // 64))
+
+
+def user_values(row):
+    return {'email': row['email'], 'first_name': row['firstname'], 'last_name': row['lastname']}
+
+
+def import_users(rows, batch_size=BATCH_SIZE, pool=None):
+    """
+    Stream user rows, skipping usernames that already exist, and hash the
+    passwords of batch N on the pool while batch N-1 is written.
+    """
+    result = StageResult('users')
+    seen = set()
+    pending = None
+    for batch in batched(rows, batch_size):
+        result.read += len(batch)
+        usernames = [row['username'] for _, row in batch]
+        seen.update(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        new_rows = []
+        for num, row in batch:
+            if row['username'] in seen:
+                result.skipped += 1
+                continue
+            seen.add(row['username'])
+            new_rows.append((num, row))
+        hashes = hash_passwords([row['password'] for _, row in new_rows], pool)
+        if pending:
+            _create_users(result, *pending, batch_size)
+        pending = (new_rows, hashes)
+    if pending:
+        _create_users(result, *pending, batch_size)
+    return result.finish()
+
+
+def _create_users(result, rows, hashes, batch_size):
+    obj_create = [User(username=row['username'], password=password, **user_values(row))
+                  for (_, row), password in zip(rows, hashes)]
+    User.objects.bulk_create(obj_create, batch_size=batch_size)
+    pks = dict(User.objects.filter(username__in=[obj.username for obj in obj_create]).values_list('username', 'id'))
+    result.object_ids.update((num, pks[row['username']]) for num, row in rows)
+    result.created += len(obj_create)
+
+
+def update_users(rows, ctx):
+    result = StageResult('users')
+    rows_by_id = {pk: row for _, row, pk in rows}
+    users = list(User.objects.filter(pk__in=rows_by_id))
+    for user in users:
+        for field, value in user_values(rows_by_id[user.id]).items():
+            setattr(user, field, value)
+    User.objects.bulk_update(users, ['email', 'first_name', 'last_name'])
+    result.updated, result.skipped = len(users), len(rows) - len(users)
+    return result.finish()
+
+
+def course_values(row, ctx):
+    return {'name': row['name'], 'price': row['price'], 'description': row['description'],
+            'teacher_id': ctx.user(row['teacher'])}
+
+
+def import_courses(rows, ctx, batch_size=BATCH_SIZE):
+    result = StageResult('courses')
+    for batch in batched(rows, batch_size):
+        result.read += len(batch)
+        pks = ctx.allocate(Course, [num for num, _ in batch])
+        obj_create = []
+        for num, row in batch:
+            values = course_values(row, ctx)
+            if values['teacher_id'] is None:
+                result.unresolved.add(num)
+                result.skipped += 1
+                continue
+            obj_create.append(Course(id=pks[num], **values))
+            ctx.course_ids[num] = result.object_ids[num] = pks[num]
+        bulkload.insert(Course, obj_create, batch_size)
+        ctx.documents[Course].update(obj.id for obj in obj_create)
+        ctx.counted_courses.update(obj.id for obj in obj_create)
+        ctx.counted_users.update(obj.teacher_id for obj in obj_create)
+        result.created += len(obj_create)
+    return result.finish()
+
+
+def update_courses(rows, ctx):
+    result = StageResult('courses')
+    rows_by_id = {pk: row for _, row, pk in rows}
+    courses = list(Course.objects.filter(pk__in=rows_by_id))
+    for course in courses:
+        values = course_values(rows_by_id[course.id], ctx)
+        values['teacher_id'] = values['teacher_id'] or course.teacher_id
+        ctx.counted_users.update((course.teacher_id, values['teacher_id']))
+        for field, value in values.items():
+            setattr(course, field, value)
+        course.updated_at = timezone.now()
+    Course.objects.bulk_update(courses, ['name', 'price', 'description', 'teacher', 'updated_at'])
+    ctx.documents[Course].update(course.id for course in courses)
+    result.updated, result.skipped = len(courses), len(rows) - len(courses)
+    return result.finish()
+
+
+def import_members(rows, ctx, batch_size=BATCH_SIZE):
+    result = StageResult('members')
+    for batch in batched(rows, batch_size):
+        result.read += len(batch)
+        obj_create, created = [], {}
+        for num, row in batch:
+            course = ctx.course(row['course_id'])
+            user = ctx.user(row['user_id'])
+            if course is None or user is None:
+                result.unresolved.add(num)
+                result.skipped += 1
+                continue
+            if (course, user) in ctx.member_pairs:
+                result.skipped += 1
+                continue
+            ctx.member_pairs.add((course, user))
+            created[(course, user)] = num
+            obj_create.append(CourseMember(course_id_id=course, user_id_id=user, roles=row['roles']))
+        bulkload.insert(CourseMember, obj_create, batch_size)
+        if created:
+            # the fast insert path does not return ids
+            for pk, course, user in CourseMember.objects.filter(
+                    course_id__in={course for course, _ in created}, user_id__in={user for _, user in created}) \
+                    .values_list('id', 'course_id', 'user_id'):
+                if (course, user) in created:
+                    ctx.member_ids[(course, user)] = result.object_ids[created[(course, user)]] = pk
+        ctx.counted_courses.update(course for course, _ in created)
+        ctx.counted_users.update(user for _, user in created)
+        result.created += len(obj_create)
+    return result.finish()
+
+
+def update_members(rows, ctx):
+    result = StageResult('members')
+    roles = {pk: row['roles'] for _, row, pk in rows}
+    members = list(CourseMember.objects.filter(pk__in=roles))
+    for member in members:
+        member.roles = roles[member.id]
+        ctx.counted_users.add(member.user_id_id)
+    CourseMember.objects.bulk_update(members, ['roles'])
+    result.updated, result.skipped = len(members), len(rows) - len(members)
+    return result.finish()
+
+
+def content_values(row, ctx):
+    return {'course_id_id': ctx.course(row['course_id']), 'name': row['name'],
+            'description': row['description'], 'parent_id_id': ctx.content(row.get('parent_id'))}
+
+
+def import_contents(rows, ctx, batch_size=BATCH_SIZE):
+    result = StageResult('contents')
+    for batch in batched(rows, batch_size):
+        result.read += len(batch)
+        pks = ctx.allocate(CourseContent, [num for num, _ in batch])
+        obj_create = []
+        for num, row in batch:
+            values = content_values(row, ctx)
+            # parents have to come earlier in the file than their children
+            if values['course_id_id'] is None or (row.get('parent_id') and values['parent_id_id'] is None):
+                result.unresolved.add(num)
+                result.skipped += 1
+                continue
+            obj_create.append(CourseContent(id=pks[num], **values))
+            ctx.content_ids[num] = result.object_ids[num] = pks[num]
+            ctx.content_courses[pks[num]] = values['course_id_id']
+        bulkload.insert(CourseContent, obj_create, batch_size)
+        ctx.content_trees.update(obj.course_id_id for obj in obj_create)
+        ctx.documents[CourseContent].update(obj.id for obj in obj_create)
+        ctx.counted_courses.update(obj.course_id_id for obj in obj_create)
+        result.created += len(obj_create)
+    return result.finish()
+
+
+def update_contents(rows, ctx):
+    result = StageResult('contents')
+    rows_by_id = {pk: row for _, row, pk in rows}
+    contents = list(CourseContent.objects.filter(pk__in=rows_by_id))
+    moved = defaultdict(list)
+    for content in contents:
+        # a row moving to another course changes both trees
+        ctx.content_trees.add(content.course_id_id)
+        values = content_values(rows_by_id[content.id], ctx)
+        if values['course_id_id'] is None:
+            values['course_id_id'] = content.course_id_id
+        if values['course_id_id'] != content.course_id_id:
+            moved[values['course_id_id']].append(content.id)
+            # it and its comments and completions are counted in the course it moves to now
+            ctx.counted_courses.update((content.course_id_id, values['course_id_id']))
+        if rows_by_id[content.id].get('parent_id') and values['parent_id_id'] is None:
+            values['parent_id_id'] = content.parent_id_id
+        for field, value in values.items():
+            setattr(content, field, value)
+        content.updated_at = timezone.now()
+    CourseContent.objects.bulk_update(contents, ['course_id', 'parent_id', 'name', 'description', 'updated_at'])
+    ctx.content_courses.update((content.id, content.course_id_id) for content in contents)
+    ctx.content_trees.update(content.course_id_id for content in contents)
+    ctx.documents[CourseContent].update(content.id for content in contents)
+    for course, ids in moved.items():
+        ContentCompletion.objects.filter(content_id__in=ids).update(course_id=course)
+        # the documents of their comments carry the course too
+        ctx.documents[Comment].update(Comment.objects.filter(content_id__in=ids).values_list('id', flat=True))
+    result.updated, result.skipped = len(contents), len(rows) - len(contents)
+    return result.finish()
+
+
+def comment_member(row, ctx):
+    content = ctx.content(row['content_id'])
+    return content, ctx.member_ids.get((ctx.content_courses.get(content), ctx.user(row['user_id'])))
+
+
+def import_comments(rows, ctx, batch_size=BATCH_SIZE):
+    """Comments point at a user; the member row is looked up through the content's course."""
+    result = StageResult('comments')
+    for batch in batched(rows, batch_size):
+        result.read += len(batch)
+        pks = ctx.allocate(Comment, [num for num, _ in batch])
+        obj_create = []
+        for num, row in batch:
+            content, member = comment_member(row, ctx)
+            if member is None:
+                result.unresolved.add(num)
+                result.skipped += 1
+                continue
+            obj_create.append(Comment(id=pks[num], content_id_id=content, member_id_id=member,
+                                      comment=row['comment']))
+            result.object_ids[num] = pks[num]
+            ctx.counted_courses.add(ctx.content_courses[content])
+            ctx.counted_users.add(ctx.user(row['user_id']))
+        bulkload.insert(Comment, obj_create, batch_size)
+        ctx.documents[Comment].update(obj.id for obj in obj_create)
+        result.created += len(obj_create)
+    return result.finish()
+
+
+def update_comments(rows, ctx):
+    result = StageResult('comments')
+    rows_by_id = {pk: (num, row) for num, row, pk in rows}
+    comments = []
+    for comment in Comment.objects.filter(pk__in=rows_by_id).select_related('member_id'):
+        num, row = rows_by_id[comment.id]
+        content, member = comment_member(row, ctx)
+        if member is None:
+            # left as it is until the row resolves
+            result.unresolved.add(num)
+            continue
+        # counted for the course and author it had and the ones it has now
+        ctx.counted_courses.update((ctx.content_courses.get(comment.content_id_id), ctx.content_courses[content]))
+        ctx.counted_users.update((comment.member_id.user_id_id, ctx.user(row['user_id'])))
+        comment.content_id_id = content
+        comment.member_id_id = member
+        comment.comment = row['comment']
+        comment.updated_at = timezone.now()
+        comments.append(comment)
+    Comment.objects.bulk_update(comments, ['content_id', 'member_id', 'comment', 'updated_at'])
+    ctx.documents[Comment].update(comment.id for comment in comments)
+    result.updated, result.skipped = len(comments), len(rows) - len(comments)
+    return result.finish()
+
+
+def import_completions(rows, ctx, batch_size=BATCH_SIZE):
+    result = StageResult('completions')
+    existing = set(ContentCompletion.objects.values_list('content_id', 'user_id'))
+    for batch in batched(rows, batch_size):
+        result.read += len(batch)
+        obj_create = []
+        for num, row in batch:
+            content = ctx.content(row['content_id'])
+            user = ctx.user(row['user_id'])
+            if content is None or user is None:
+                result.unresolved.add(num)
+                result.skipped += 1
+                continue
+            if (content, user) in existing:
+                result.skipped += 1
+                continue
+            existing.add((content, user))
+            obj_create.append(ContentCompletion(content_id=content, user_id=user,
+                                                course_id=ctx.content_courses[content]))
+            ctx.counted_courses.add(ctx.content_courses[content])
+            ctx.counted_users.add(user)
+        bulkload.insert(ContentCompletion, obj_create, batch_size)
+        result.created += len(obj_create)
+    return result.finish()
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        while chunk := source.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(row, fields):
+    return hashlib.sha256('\x1f'.join(str(row.get(field, '')) for field in fields).encode()).hexdigest()
+
+
+def sync_source(name, path, rows, key, fields, update, create, batch_size=BATCH_SIZE, retry=False, full=False):
+    """
+    Incremental import of one source file.
+
+    Every batch commits together with the fingerprints of its rows and the
+    checkpoint, so a crashed run resumes after the last finished batch. An
+    unchanged file whose previous run completed is not read at all, rows
+    whose fingerprint matches the last import are not written, and changed
+    rows are updated through the primary key recorded when they were
+    created; rows the import did not create are never updated. Rows
+    whose references could not be resolved get no fingerprint and are
+    counted on the checkpoint; they can only resolve once the rows they
+    point at arrive, so the file is read again for them when `retry` says
+    an earlier source changed in this run. `full` reads the whole file
+    whatever the checkpoint says.
+    """
+    result = StageResult(name)
+    digest = file_digest(path)
+    checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=name)
+    if checkpoint.file_digest == digest and checkpoint.completed and not (retry and checkpoint.unresolved or full):
+        return result.finish()
+    if checkpoint.file_digest != digest or checkpoint.completed or full:
+        checkpoint.file_digest = digest
+        checkpoint.rows_done = 0
+        checkpoint.completed = False
+    if checkpoint.rows_done == 0:
+        checkpoint.unresolved = 0
+
+    for batch in batched(islice(rows, checkpoint.rows_done, None), batch_size):
+        result.read += len(batch)
+        keyed = {key(num, row): (num, row) for num, row in batch}
+        with transaction.atomic():
+            records = {record.key: record for record in ImportRecord.objects.filter(source=name, key__in=keyed)}
+            dirty = {}
+            for row_key, (num, row) in keyed.items():
+                row_fingerprint = fingerprint(row, fields)
+                record = records.get(row_key)
+                if record is not None and record.fingerprint == row_fingerprint:
+                    result.skipped += 1
+                    continue
+                dirty[row_key] = (num, row, row_fingerprint)
+
+            owned, new = [], []
+            for row_key, (num, row, _) in dirty.items():
+                record = records.get(row_key)
+                if record is not None and record.object_id is not None:
+                    owned.append((num, row, record.object_id))
+                else:
+                    new.append((num, row))
+            stages = ([update(owned)] if owned else []) + ([create(new)] if new else [])
+            object_ids = {}
+            for stage in stages:
+                result.created += stage.created
+                result.updated += stage.updated
+                result.skipped += stage.skipped
+                result.unresolved |= stage.unresolved
+                checkpoint.unresolved += len(stage.unresolved)
+                object_ids.update(stage.object_ids)
+
+            new_records, changed_records = [], []
+            for row_key, (num, row, row_fingerprint) in dirty.items():
+                if num in result.unresolved:
+                    continue
+                record = records.get(row_key)
+                if record is None:
+                    new_records.append(ImportRecord(source=name, key=row_key, fingerprint=row_fingerprint,
+                                                    object_id=object_ids.get(num)))
+                else:
+                    record.fingerprint = row_fingerprint
+                    record.object_id = record.object_id or object_ids.get(num)
+                    changed_records.append(record)
+            ImportRecord.objects.bulk_create(new_records)
+            ImportRecord.objects.bulk_update(changed_records, ['fingerprint', 'object_id'])
+
+            checkpoint.rows_done += len(batch)
+            checkpoint.save()
+
+    checkpoint.completed = True
+    checkpoint.save()
+    return result.finish()
+
+
+def sync_all(path, ctx, batch_size=BATCH_SIZE, pool=None, full=False):
+    """Run every source file through `sync_source`, yielding one result per file."""
+    sources = [
+        ('users', 'user-data.csv', read_csv, lambda num, row: row['username'],
+         ['email', 'firstname', 'lastname'], update_users,
+         lambda rows: import_users(rows, batch_size, pool)),
+        ('courses', 'course-data.csv', read_csv, lambda num, row: str(num),
+         ['name', 'description', 'price', 'teacher'], update_courses,
+         lambda rows: import_courses(rows, ctx, batch_size)),
+        ('members', 'member-data.csv', read_csv, lambda num, row: f"{row['course_id']}:{row['user_id']}",
+         ['roles'], update_members,
+         lambda rows: import_members(rows, ctx, batch_size)),
+        ('contents', 'contents.json', read_json, lambda num, row: str(num),
+         ['course_id', 'parent_id', 'name', 'description'], update_contents,
+         lambda rows: import_contents(rows, ctx, batch_size)),
+        ('comments', 'comments.json', read_json, lambda num, row: str(num),
+         ['content_id', 'user_id', 'comment'], update_comments,
+         lambda rows: import_comments(rows, ctx, batch_size)),
+    ]
+    if (path / 'completions.json').exists():
+        sources.append(('completions', 'completions.json', read_json,
+                        lambda num, row: f"{row['content_id']}:{row['user_id']}", [],
+                        lambda rows, ctx: StageResult('completions'),
+                        lambda rows: import_completions(rows, ctx, batch_size)))
+    changed = False
+    for name, filename, reader, key, fields, update, create in sources:
+        result = sync_source(name, path / filename, numbered(reader(path / filename)), key, fields,
+                             lambda rows, update=update: update(rows, ctx), create, batch_size, retry=changed,
+                             full=full)
+        changed = changed or result.changed
+        yield result
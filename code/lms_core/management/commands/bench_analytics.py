@@ -0,0 +1,67 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from ninja_simple_jwt.jwt.token_operations import get_access_token_for_user
+
+from lms_core.models import Course
+
+
+class Command(BaseCommand):
+    help = ("Compare the analytics of one teacher's courses fetched with one course_analytics/<id>/ "
+            "request per course against one /api/v1/courses/analytics request")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', default=20, type=int)
+        parser.add_argument('--out', default=Path('bench-analytics.json'), type=Path)
+
+    def handle(self, *args, **options):
+        teacher = User.objects.annotate(n=Count('course')).order_by('-n').first()
+        if teacher is None or not teacher.n:
+            raise CommandError("No course in the database, run import_lms first")
+        ids = list(Course.objects.filter(teacher=teacher).order_by('id').values_list('id', flat=True))
+        client = Client(HTTP_HOST='localhost')
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {get_access_token_for_user(teacher)[0]}'}
+
+        def per_course():
+            return [client.get(f'/course_analytics/{course_id}/').json() for course_id in ids]
+
+        def batch():
+            return client.get('/api/v1/courses/analytics', {'teacher': teacher.id}, **headers).json()
+
+        results = {name: self.measure(run, options['iterations'])
+                   for name, run in (('per_course_loop', per_course), ('batch_endpoint', batch))}
+        for name, result in results.items():
+            self.stdout.write(f"{name}: {result}")
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'courses': len(ids),
+            'results': results,
+        }
+        options['out'].write_text(json.dumps(report, indent=2, sort_keys=True))
+        self.stdout.write(f"results written to {options['out']}")
+
+    def measure(self, run, iterations):
+        run()  # warm up
+        timings = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+        return {
+            'p50_ms': round(statistics.median(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'queries': len(queries),
+        }
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.db.models import Count
+from django.test import AsyncClient, Client, override_settings
+from django.utils import timezone
+
+from lms_core.models import Course
+
+
+class PeakThreads:
+    """Samples threading.active_count() while a run is in flight."""
+
+    def __enter__(self):
+        self.peak, self.running = 0, True
+        self.sampled = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+        self.sampler.start()
+        # every sample, the one before the run included, is taken by the sampler
+        self.sampled.wait()
+        return self
+
+    def sample(self):
+        while self.running:
+            # not counting the sampler itself
+            self.peak = max(self.peak, threading.active_count() - 1)
+            self.sampled.set()
+            time.sleep(0.002)
+
+    def __exit__(self, *exc):
+        self.running = False
+        self.sampler.join()
+
+
+class Command(BaseCommand):
+    help = ("Compare the async api/v1 views on the ASGI handler with the sync views on WSGI worker "
+            "threads: throughput, peak threads and traced memory per in-flight request")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', default=500, type=int)
+        parser.add_argument('--concurrency', default=50, type=int)
+        parser.add_argument('--out', default=Path('bench-asgi.json'), type=Path)
+
+    def handle(self, *args, **options):
+        course = Course.objects.annotate(n=Count('coursecontent')).order_by('-n').values_list('id', flat=True).first()
+        routes = {
+            'courses': ('/api/v1/courses', '/api/v1/async/courses'),
+            'contents': (f'/api/v1/courses/{course}/contents', f'/api/v1/async/courses/{course}/contents'),
+            'analytics': (f'/course_analytics/{course}/', f'/api/v1/async/courses/{course}/analytics'),
+        }
+        requests, concurrency = options['requests'], options['concurrency']
+
+        results = {}
+        # measure the views, not the response cache in front of the sync ones; the test
+        # clients send their requests to the host `testserver`
+        with override_settings(RESPONSE_CACHE_ALIAS=None, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, (sync_url, async_url) in routes.items():
+                results[name] = {
+                    'wsgi_threads': self.measure(lambda: self.run_wsgi(sync_url, requests, concurrency),
+                                                 requests, concurrency),
+                    'asgi_async': self.measure(lambda: asyncio.run(self.run_asgi(async_url, requests, concurrency)),
+                                               requests, concurrency),
+                }
+                for mode, result in results[name].items():
+                    self.stdout.write(f"{name} {mode}: {result}")
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'requests': requests,
+            'concurrency': concurrency,
+            'routes': results,
+        }
+        options['out'].write_text(json.dumps(report, indent=2, sort_keys=True))
+        self.stdout.write(f"results written to {options['out']}")
+        invalid = [f"{name} {mode}" for name, modes in results.items()
+                   for mode, result in modes.items() if not result['valid']]
+        if invalid:
+            raise CommandError(f"timings of error responses, not valid: {', '.join(invalid)}")
+
+    def measure(self, run, requests, concurrency):
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        with PeakThreads() as threads:
+            started = time.perf_counter()
+            statuses = run()
+            seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+        errors = sum(not 200 <= status < 300 for status in statuses)
+        return {
+            'seconds': round(seconds, 3),
+            'requests_per_second': round(requests / seconds, 1),
+            'errors': errors,
+            'valid': errors == 0,
+            'peak_threads': threads.peak,
+            'kib_per_in_flight_request': round(peak / 1024 / concurrency, 1),
+        }
+
+    def run_wsgi(self, url, requests, concurrency):
+        local = threading.local()
+
+        def get(_):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            return local.client.get(url).status_code
+
+        def run(_):
+            # each pool thread plays one WSGI worker thread, with its own connection
+            try:
+                return get(_)
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(run, range(requests)))
+
+    async def run_asgi(self, url, requests, concurrency):
+        client = AsyncClient()
+        in_flight = asyncio.Semaphore(concurrency)
+
+        async def get():
+            async with in_flight:
+                return (await client.get(url)).status_code
+
+        return await asyncio.gather(*(get() for _ in range(requests)))
@@ -0,0 +1,39 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from lms_core import bulkload
+from lms_core.models import Course, CourseContent
+
+
+class Command(BaseCommand):
+    help = "Compare bulk_create with the COPY/executemany fast path; every run is rolled back"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default=100_000, type=int)
+        parser.add_argument('--batch-size', default=bulkload.BATCH_SIZE, type=int)
+
+    def handle(self, *args, **options):
+        rows, batch_size = options['rows'], options['batch_size']
+        fast_path = 'COPY' if connection.vendor == 'postgresql' else 'executemany'
+
+        orm = self.run(rows, lambda objs: CourseContent.objects.bulk_create(objs, batch_size=batch_size))
+        fast = self.run(rows, lambda objs: bulkload.insert(CourseContent, objs, batch_size))
+
+        self.stdout.write(f"bulk_create: {rows} rows in {orm:.2f}s ({rows / orm:.0f} rows/s)")
+        self.stdout.write(f"{fast_path}: {rows} rows in {fast:.2f}s ({rows / fast:.0f} rows/s)")
+        self.stdout.write(f"speedup: {orm / fast:.1f}x")
+
+    def run(self, rows, insert):
+        with transaction.atomic():
+            teacher = User.objects.create(username='bench-bulkload')
+            course = Course.objects.create(name="Bench", description="", price=0, teacher=teacher)
+            objs = [CourseContent(course_id=course, name=f"Konten {num}", description="x" * 200)
+                    for num in range(rows)]
+            started = time.perf_counter()
+            insert(objs)
+            seconds = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return seconds
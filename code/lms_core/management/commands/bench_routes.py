@@ -0,0 +1,165 @@
+import json
+import logging
+import re
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from ninja_simple_jwt.jwt.token_operations import get_access_token_for_user
+
+from lms_core import search
+from lms_core.api import apiv1
+from lms_core.models import Announcement, Category, Comment, Course, CourseContent, CourseMember
+
+# legacy GET views that write to the database
+MUTATING_VIEWS = {'tambah/', 'ubah/', 'hapus/'}
+SKIPPED_PREFIXES = ('admin/', 'api/')
+
+
+class Command(BaseCommand):
+    help = "Time every GET route of api/v1 and the legacy views, writing p50/p95/p99 and query counts as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', default=50, type=int)
+        parser.add_argument('--out', default=Path('bench-results.json'), type=Path)
+        parser.add_argument('--match', default='', help="Only run routes containing this text")
+
+    def handle(self, *args, **options):
+        params = self.sample_params()
+        course = Course.objects.filter(id=params['course_id']).select_related('teacher').first()
+        member = CourseMember.objects.filter(course_id=params['course_id'], roles='std') \
+            .select_related('user_id').first()
+        # a student of the sampled course, its teacher, and staff for exports and metrics
+        staff = User.objects.filter(is_staff=True).first() or \
+            User.objects.get_or_create(username='bench-staff', defaults={'is_staff': True})[0]
+        users = [member and member.user_id, course and course.teacher, staff]
+        sessions = [self.session(user) for user in users if user is not None]
+        schema = apiv1.get_openapi_schema(path_prefix='/api/v1')
+
+        # 4xx/5xx responses are reported below, not logged
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        results, skipped, failed = {}, {}, {}
+        # measure the views, not the response cache in front of them
+        with override_settings(RESPONSE_CACHE_ALIAS=None):
+            for route in self.routes(schema):
+                if options['match'] not in route:
+                    continue
+                names = [m[1] or m[2] for m in re.finditer(r'{(\w+)}|<(?:\w+:)?(\w+)>', route)]
+                if missing := [name for name in names if params.get(name) is None]:
+                    skipped[f"GET {route}"] = f"no row to sample for {', '.join(missing)}"
+                    continue
+                url = re.sub(r'{(\w+)}|<(?:\w+:)?(\w+)>', lambda m: str(params[m[1] or m[2]]), route)
+                query = self.query(schema, route, params)
+                statuses = []
+                for client, headers in sessions:
+                    statuses.append(client.get(url, query, **headers).status_code)
+                    if 200 <= statuses[-1] < 300:
+                        break
+                else:
+                    if all(status == 405 for status in statuses):
+                        skipped[f"GET {route}"] = "does not answer GET"
+                    else:
+                        failed[f"GET {route}"] = {'url': url, 'query': query, 'statuses': statuses}
+                        self.stderr.write(f"GET {route} answered {statuses} to every user, not timed")
+                    continue
+                result = self.measure(client, url, query, headers, options['iterations'])
+                results[f"GET {route}"] = result
+                self.stdout.write(f"GET {route}: {result}")
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'params': params,
+            'routes': results,
+            'skipped': skipped,
+            'failed': failed,
+        }
+        options['out'].write_text(json.dumps(report, indent=2, sort_keys=True))
+        self.stdout.write(f"results written to {options['out']}")
+        if failed:
+            raise CommandError(f"{len(failed)} routes answered no user with 2xx: {', '.join(failed)}")
+
+    def session(self, user):
+        client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+        if user is None:
+            return client, {}
+        client.force_login(user)
+        return client, {'HTTP_AUTHORIZATION': f'Bearer {get_access_token_for_user(user)[0]}'}
+
+    def routes(self, schema):
+        for path, methods in schema['paths'].items():
+            if 'get' in methods:
+                yield path
+        yield from self.legacy_routes(get_resolver().url_patterns)
+
+    def legacy_routes(self, patterns, prefix=''):
+        for pattern in patterns:
+            route = prefix + str(pattern.pattern)
+            if route.startswith(SKIPPED_PREFIXES) or route in MUTATING_VIEWS:
+                continue
+            if isinstance(pattern, URLResolver):
+                yield from self.legacy_routes(pattern.url_patterns, route)
+            elif isinstance(pattern, URLPattern):
+                yield '/' + route
+
+    def sample_params(self):
+        """
+        Ids of the busiest rows, so every route is measured at its worst; the
+        course is the sampled content's, so nested routes find the content.
+        None when there is no row to sample.
+        """
+        content = (CourseContent.objects.annotate(approved=Count('comment', filter=Q(comment__is_approved=True)),
+                                                  n=Count('comment'))
+                   .order_by('-approved', '-n').values('id', 'name', 'course_id').first() or {})
+        course = content.get('course_id') or \
+            Course.objects.annotate(n=Count('coursemember')).order_by('-n').values_list('id', flat=True).first()
+        return {
+            'course_id': course,
+            'content_id': content.get('id'),
+            'comment_id': Comment.objects.filter(content_id=content.get('id'))
+                                         .values_list('id', flat=True).first(),
+            'user_id': User.objects.annotate(n=Count('coursemember')).order_by('-n')
+                                   .values_list('id', flat=True).first(),
+            'announcement_id': Announcement.objects.filter(course_id=course).values_list('id', flat=True).first(),
+            'category_id': Category.objects.values_list('id', flat=True).first(),
+            'table': 'courses',
+            # query parameters
+            'q': next(iter(search.terms(content.get('name', ''))), 'django'),
+            'ids': course,
+        }
+
+    def query(self, schema, route, params):
+        """The sampled values of the query parameters `route` declares."""
+        parameters = schema['paths'].get(route, {}).get('get', {}).get('parameters', [])
+        return {param['name']: params[param['name']] for param in parameters
+                if param['in'] == 'query' and param['name'] in ('q', 'ids')}
+
+    def measure(self, client, url, query, headers, iterations):
+        client.get(url, query, **headers)  # warm up
+        timings = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url, query, **headers)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+        percentiles = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+        return {
+            'url': url,
+            'query': query,
+            'status': response.status_code,
+            'p50_ms': round(percentiles[49], 3),
+            'p95_ms': round(percentiles[94], 3),
+            'p99_ms': round(percentiles[98], 3),
+            'queries': len(queries),
+        }
@@ -0,0 +1,142 @@
+import csv
+import json
+import random
+from itertools import accumulate
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lms_core.importer import read_csv, read_json
+
+
+class Command(BaseCommand):
+    help = "Write a synthetic csv_data set, the seed files scaled up by --scale, for import_lms"
+
+    def add_arguments(self, parser):
+        parser.add_argument('out', type=Path, help="Directory to write the generated files to")
+        parser.add_argument('--scale', default=10, type=int)
+        parser.add_argument('--seed-path', default=settings.BASE_DIR / 'csv_data', type=Path)
+        parser.add_argument('--random-seed', default=42, type=int)
+        parser.add_argument('--max-depth', default=4, type=int, help="Deepest parent_id chain in a course")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['random_seed'])
+        seed, out, scale = options['seed_path'], options['out'], options['scale']
+        out.mkdir(parents=True, exist_ok=True)
+
+        users = list(read_csv(seed / 'user-data.csv'))
+        courses = list(read_csv(seed / 'course-data.csv'))
+        member_count = sum(1 for _ in read_csv(seed / 'member-data.csv'))
+        contents = list(read_json(seed / 'contents.json'))
+        comments = [row['comment'] for row in read_json(seed / 'comments.json')]
+
+        n_users, n_courses = len(users) * scale, len(courses) * scale
+        self.write_users(out, users, n_users)
+        self.write_courses(out, courses, n_courses, n_users)
+        members = self.write_members(out, member_count * scale, n_courses, n_users)
+        content_courses = self.write_contents(out, contents, len(contents) * scale, n_courses,
+                                              options['max_depth'])
+        n_comments = self.write_comments(out, comments, len(comments) * scale, content_courses, members)
+        n_completions = self.write_completions(out, content_courses, members)
+
+        self.stdout.write(f"{n_users} users, {n_courses} courses, {sum(map(len, members.values()))} members, "
+                          f"{len(content_courses)} contents, {n_comments} comments, "
+                          f"{n_completions} completions written to {out}")
+
+    def zipf_weights(self, n, exponent=1.1):
+        """Cumulative weights where a few items get most of the traffic."""
+        ranks = list(range(1, n + 1))
+        self.random.shuffle(ranks)
+        return list(accumulate(1 / rank ** exponent for rank in ranks))
+
+    def write_users(self, out, users, count):
+        with open(out / 'user-data.csv', 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=['firstname', 'lastname', 'email', 'password', 'username'])
+            writer.writeheader()
+            for num in range(count):
+                row = users[num % len(users)]
+                writer.writerow({**row, 'username': f"{row['username']}{num}",
+                                 'email': f"{num}.{row['email']}"})
+
+    def write_courses(self, out, courses, count, n_users):
+        # a small pool of teachers, like the seed data
+        teachers = self.random.sample(range(1, n_users + 1), max(1, n_users // 10))
+        with open(out / 'course-data.csv', 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=['name', 'url', 'description', 'site', 'price', 'teacher'])
+            writer.writeheader()
+            for num in range(count):
+                row = courses[num % len(courses)]
+                writer.writerow({**row, 'name': f"{row['name']} {num // len(courses) + 1}",
+                                 'url': f"{row['url']}?batch={num}", 'teacher': self.random.choice(teachers)})
+
+    def write_members(self, out, count, n_courses, n_users):
+        """Enrollment per course follows a power law; returns course -> set of users."""
+        weights = self.zipf_weights(n_courses)
+        courses = range(1, n_courses + 1)
+        members = {}
+        with open(out / 'member-data.csv', 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['course_id', 'user_id', 'roles'])
+            for course in self.random.choices(courses, cum_weights=weights, k=count):
+                user = self.random.randint(1, n_users)
+                if user in members.setdefault(course, set()):
+                    continue
+                members[course].add(user)
+                writer.writerow([course, user, 'std'])
+        return members
+
+    def write_contents(self, out, contents, count, n_courses, max_depth):
+        """Contents form trees per course, returns the course of every content position."""
+        content_courses = []
+        # course -> [(position, depth)] of contents that can still take children
+        parents = {}
+        with open(out / 'contents.json', 'w', encoding='utf-8') as jsonfile:
+            for num in range(1, count + 1):
+                row = contents[(num - 1) % len(contents)]
+                course = self.random.randint(1, n_courses)
+                candidates = parents.setdefault(course, [])
+                parent, depth = None, 0
+                if candidates and self.random.random() < 0.8:
+                    parent, depth = candidates[-1] if self.random.random() < 0.6 else self.random.choice(candidates)
+                    depth += 1
+                if depth < max_depth:
+                    candidates.append((num, depth))
+                content_courses.append(course)
+                jsonfile.write(json.dumps({'course_id': course, 'parent_id': parent,
+                                           'name': row['name'], 'description': row['description']}) + '\n')
+        return content_courses
+
+    def write_comments(self, out, comments, count, content_courses, members):
+        """
+        Comments arrive in bursts: runs of replies on one hot content by its course
+        members. Only contents of courses with members get any; returns the number written.
+        """
+        contents = [num for num, course in enumerate(content_courses, start=1) if members.get(course)]
+        weights = self.zipf_weights(len(contents))
+        written = 0
+        with open(out / 'comments.json', 'w', encoding='utf-8') as jsonfile:
+            while written < count and contents:
+                content = self.random.choices(contents, cum_weights=weights)[0]
+                authors = list(members[content_courses[content - 1]])
+                for _ in range(min(count - written, int(self.random.paretovariate(1.5)))):
+                    jsonfile.write(json.dumps({'content_id': content, 'user_id': self.random.choice(authors),
+                                               'comment': self.random.choice(comments)}) + '\n')
+                    written += 1
+        return written
+
+    def write_completions(self, out, content_courses, members):
+        """Every member finishes a leading share of their course; returns the number written."""
+        by_course = {}
+        for num, course in enumerate(content_courses, start=1):
+            by_course.setdefault(course, []).append(num)
+        written = 0
+        with open(out / 'completions.json', 'w', encoding='utf-8') as jsonfile:
+            for course, users in members.items():
+                course_contents = by_course.get(course, [])
+                for user in users:
+                    done = course_contents[:int(len(course_contents) * self.random.random())]
+                    for content in done:
+                        jsonfile.write(json.dumps({'content_id': content, 'user_id': user}) + '\n')
+                    written += len(done)
+        return written
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lms_core import bulkload, importer, responsecache, search, stats
+from lms_core.outline import rebuild_paths
+from lms_core.enrollment import reconcile_enrolled_counts
+from lms_core.models import Course, CourseContent, Comment
+
+
+class Command(BaseCommand):
+    help = "Import users, courses, members, contents and comments from the csv_data files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=settings.BASE_DIR / 'csv_data', type=Path,
+                            help="Directory holding the csv/json source files")
+        parser.add_argument('--batch-size', default=importer.BATCH_SIZE, type=int)
+        parser.add_argument('--workers', default=None, type=int,
+                            help="Processes used for password hashing (default: all cores)")
+        parser.add_argument('--incremental', action='store_true',
+                            help="Only write new or changed rows, committing and checkpointing every batch")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        ctx = importer.ImportContext(importer.read_csv(path / 'user-data.csv'))
+
+        pool = importer.hash_pool(options['workers'])
+        changed = False
+        try:
+            if options['incremental']:
+                for result in importer.sync_all(path, ctx, batch_size, pool):
+                    changed = self.report(result) or changed
+            else:
+                # every file read again in one transaction, leaving the fingerprints and
+                # checkpoints an incremental run picks up from
+                with transaction.atomic():
+                    for result in importer.sync_all(path, ctx, batch_size, pool, full=True):
+                        changed = self.report(result) or changed
+        finally:
+            if pool:
+                pool.shutdown()
+        if not changed:
+            self.stdout.write("nothing changed")
+            return
+
+        # rows were inserted with explicit ids, move the sequences past them
+        bulkload.reset_sequences(Course, CourseContent, Comment)
+        # members were bulk inserted without claiming seats, and nothing was counted or indexed;
+        # enrolled_count is the only member counter, CourseStats does not keep one
+        reconcile_enrolled_counts(ctx.counted_courses)
+        stats.rebuild(ctx.counted_courses, ctx.counted_users)
+        if ctx.content_trees:
+            # in one transaction, the outline never reads a tree with its paths cleared
+            with transaction.atomic():
+                rebuild_paths(course_ids=ctx.content_trees)
+        search.reindex(ctx.documents)
+        # bulk writes skip the model signals that keep cached responses fresh
+        responsecache.invalidate_all()
+
+    def report(self, result):
+        """Print a stage result; returns whether the stage wrote anything."""
+        self.stdout.write(str(result))
+        return result.changed
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lms_core import importer
+
+
+class Command(BaseCommand):
+    help = "Create users from a csv with firstname,lastname,email,password,username columns"
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', type=Path)
+        parser.add_argument('--batch-size', default=importer.BATCH_SIZE, type=int)
+        parser.add_argument('--workers', default=None, type=int,
+                            help="Processes used for password hashing (default: all cores)")
+
+    def handle(self, *args, **options):
+        pool = importer.hash_pool(options['workers'])
+        try:
+            with transaction.atomic():
+                result = importer.import_users(importer.numbered(importer.read_csv(options['csv_file'])),
+                                               options['batch_size'], pool)
+        finally:
+            if pool:
+                pool.shutdown()
+        self.stdout.write(str(result))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from lms_core import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of courses, contents and approved comments"
+
+    def handle(self, *args, **options):
+        if not search.supported():
+            self.stdout.write("this database backend has no search index")
+            return
+        search.rebuild()
+        self.stdout.write("search index rebuilt")
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from lms_core import stats
+from lms_core.models import CourseStats, UserStats
+
+
+class Command(BaseCommand):
+    help = "Recompute the course and user counters behind the dashboards from the source tables"
+
+    def handle(self, *args, **options):
+        stats.rebuild()
+        self.stdout.write(f"{CourseStats.objects.count()} course and {UserStats.objects.count()} user counters rebuilt")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from lms_core.enrollment import reconcile_enrolled_counts
+
+
+class Command(BaseCommand):
+    help = "Recount Course.enrolled_count from the CourseMember rows and repair any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int, help="Only these courses (default: all)")
+
+    def handle(self, *args, **options):
+        repaired = reconcile_enrolled_counts(options['course_ids'] or None)
+        self.stdout.write(f"{repaired} courses repaired")
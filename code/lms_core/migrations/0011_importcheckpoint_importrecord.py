@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_core', '0010_alter_category_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100, unique=True)),
+                ('file_digest', models.CharField(blank=True, max_length=64)),
+                ('rows_done', models.PositiveBigIntegerField(default=0)),
+                ('unresolved', models.PositiveBigIntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Checkpoint Import',
+                'verbose_name_plural': 'Checkpoint Import',
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=255)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('object_id', models.BigIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('source', 'key')},
+            },
+        ),
+    ]
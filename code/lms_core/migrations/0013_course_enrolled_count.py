@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_members(apps, schema_editor):
+    Course = apps.get_model('lms_core', 'Course')
+    CourseMember = apps.get_model('lms_core', 'CourseMember')
+    members = (CourseMember.objects.filter(course_id=OuterRef('pk')).order_by()
+               .values('course_id').annotate(n=Count('id')).values('n'))
+    Course.objects.update(enrolled_count=Coalesce(Subquery(members), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_core', '0012_course_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='enrolled_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Jumlah Siswa Terdaftar'),
+        ),
+        migrations.RunPython(count_members, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count(model, path, **match):
+    rows = (model.objects.filter(**{path: OuterRef('pk')}, **match).order_by()
+            .values(path).annotate(n=Count('pk')).values('n'))
+    return Coalesce(Subquery(rows), Value(0))
+
+
+def backfill(apps, schema_editor):
+    get = lambda name: apps.get_model('lms_core', name)
+    Course, CourseStats, UserStats = get('Course'), get('CourseStats'), get('UserStats')
+    CourseMember, CourseContent, Comment, ContentCompletion = (
+        get('CourseMember'), get('CourseContent'), get('Comment'), get('ContentCompletion'))
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    CourseStats.objects.bulk_create([CourseStats(pk=pk) for pk in Course.objects.values_list('pk', flat=True)])
+    CourseStats.objects.update(contents=count(CourseContent, 'course_id'),
+                               comments=count(Comment, 'content_id__course_id'),
+                               completions=count(ContentCompletion, 'content__course_id'))
+    UserStats.objects.bulk_create([UserStats(pk=pk) for pk in User.objects.values_list('pk', flat=True)])
+    UserStats.objects.update(courses_as_student=count(CourseMember, 'user_id', roles='std'),
+                             courses_created=count(Course, 'teacher'),
+                             comments_written=count(Comment, 'member_id__user_id'),
+                             contents_completed=count(ContentCompletion, 'user'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('lms_core', '0013_course_enrolled_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='lms_core.course')),
+                ('contents', models.PositiveIntegerField(default=0, verbose_name='Jumlah Konten')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='Jumlah Komentar')),
+                ('completions', models.PositiveIntegerField(default=0, verbose_name='Jumlah Konten Selesai')),
+            ],
+            options={
+                'verbose_name': 'Statistik Mata Kuliah',
+                'verbose_name_plural': 'Statistik Mata Kuliah',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('courses_as_student', models.PositiveIntegerField(default=0, verbose_name='Jumlah Course Diikuti')),
+                ('courses_created', models.PositiveIntegerField(default=0, verbose_name='Jumlah Course Dibuat')),
+                ('comments_written', models.PositiveIntegerField(default=0, verbose_name='Jumlah Komentar')),
+                ('contents_completed', models.PositiveIntegerField(default=0, verbose_name='Jumlah Konten Selesai')),
+            ],
+            options={
+                'verbose_name': 'Statistik Pengguna',
+                'verbose_name_plural': 'Statistik Pengguna',
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
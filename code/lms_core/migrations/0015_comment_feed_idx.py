@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_core', '0014_course_user_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['content_id', '-created_at', '-id'], name='comment_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+CREATE = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE lms_core_search USING fts5("
+        "course_id UNINDEXED, title, body, tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    'postgresql': [
+        "CREATE TABLE lms_core_search (key bigint PRIMARY KEY, course_id bigint NOT NULL, "
+        "title text NOT NULL, body text NOT NULL, document tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')) STORED)",
+        "CREATE INDEX lms_core_search_document_idx ON lms_core_search USING gin (document)",
+    ],
+}
+
+FILL = [
+    "SELECT id * 4 + 1, id, name, description FROM lms_core_course",
+    "SELECT id * 4 + 2, course_id_id, name, description FROM lms_core_coursecontent",
+    "SELECT c.id * 4 + 3, cc.course_id_id, '', c.comment FROM lms_core_comment c "
+    "JOIN lms_core_coursecontent cc ON cc.id = c.content_id_id WHERE c.is_approved",
+]
+
+
+def create(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE:
+        return
+    key = 'rowid' if vendor == 'sqlite' else 'key'
+    for sql in CREATE[vendor]:
+        schema_editor.execute(sql)
+    for select in FILL:
+        schema_editor.execute(f"INSERT INTO lms_core_search ({key}, course_id, title, body) {select}")
+
+
+def drop(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE:
+        schema_editor.execute("DROP TABLE lms_core_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_core', '0015_comment_feed_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create, drop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:37
+
+from django.db import migrations, models
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+
+def fill_paths(apps, schema_editor):
+    # a frozen copy of lms_core.outline.rebuild_paths at the time of this migration
+    CourseContent = apps.get_model('lms_core', 'CourseContent')
+    segment = LPad(Cast('id', CharField()), 10, Value('0'))
+    CourseContent.objects.filter(parent_id__isnull=True).update(path=segment)
+    parent_path = CourseContent.objects.filter(pk=OuterRef('parent_id')).values('path')[:1]
+    while CourseContent.objects.filter(path='', parent_id__in=CourseContent.objects.exclude(path='')) \
+            .update(path=Concat(Subquery(parent_path), segment)):
+        pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_core', '0016_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursecontent',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=250, verbose_name='Jalur'),
+        ),
+        migrations.AddIndex(
+            model_name='coursecontent',
+            index=models.Index(fields=['course_id', 'path'], name='content_path_idx'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_core', '0017_content_path'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coursecontent',
+            index=models.Index(fields=['course_id', 'scheduled_start_time', 'scheduled_end_time'], name='content_schedule_idx'),
+        ),
+    ]
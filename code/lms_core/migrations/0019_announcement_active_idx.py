@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_core', '0018_content_schedule_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['course', 'start_date', 'end_date'], name='announcement_active_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_courses(apps, schema_editor):
+    ContentCompletion = apps.get_model('lms_core', 'ContentCompletion')
+    CourseContent = apps.get_model('lms_core', 'CourseContent')
+    course = CourseContent.objects.filter(pk=OuterRef('content_id')).values('course_id')[:1]
+    ContentCompletion.objects.update(course_id=Subquery(course))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_core', '0019_announcement_active_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentcompletion',
+            name='course',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE,
+                                    to='lms_core.course'),
+        ),
+        migrations.RunPython(copy_courses, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='contentcompletion',
+            name='course',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE,
+                                    to='lms_core.course'),
+        ),
+        migrations.AddIndex(
+            model_name='contentcompletion',
+            index=models.Index(fields=['course', 'user'], name='completion_course_user_idx'),
+        ),
+    ]
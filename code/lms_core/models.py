@@ -1,9 +1,28 @@
-import datetime
-from django.db import models
+import math
+
+from django.db import models, transaction
+from django.db.models import F, Min, Q, Value
+from django.db.models.functions import Concat, Substr
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+
+def seconds_to_next_boundary(queryset, start_field, end_field):
+    """
+    Seconds until the next time a row of `queryset` starts or ends its window,
+    rounded up past the boundary, or None when none is ahead. One query.
+    """
+    now = timezone.now()
+    bounds = queryset.aggregate(
+        start=Min(start_field, filter=Q(**{f'{start_field}__gt': now})),
+        end=Min(end_field, filter=Q(**{f'{end_field}__gte': now})),
+    )
+    upcoming = [bound for bound in bounds.values() if bound]
+    if not upcoming:
+        return None
+    return math.ceil((min(upcoming) - now).total_seconds()) + 1
+
 class Course(models.Model):
     name = models.CharField("Nama", max_length=255)
     description = models.TextField("Deskripsi")
@@ -12,6 +31,8 @@ class Course(models.Model):
     teacher = models.ForeignKey(User, verbose_name="Pengajar", on_delete=models.RESTRICT)
     category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='courses')
     max_students = models.IntegerField("Jumlah Maksimal Siswa", default=30)  
+    # the one member counter: seats are claimed against it, and the dashboards read it
+    enrolled_count = models.PositiveIntegerField("Jumlah Siswa Terdaftar", default=0, editable=False)
     created_at = models.DateTimeField("Dibuat pada", auto_now_add=True)
     updated_at = models.DateTimeField("Diperbarui pada", auto_now=True)
 
@@ -19,19 +40,24 @@ class Course(models.Model):
         return self.name
 
     def is_full(self):
-        return CourseMember.objects.filter(course_id=self).count() >= self.max_students
+        return self.enrolled_count >= self.max_students
 
     def get_course_stats(self):
+        # the stored member count, not this instance's: seats are claimed with UPDATEs
+        row = Course.objects.filter(pk=self.pk).values(
+            'enrolled_count', 'stats__contents', 'stats__comments', 'stats__completions').get()
         return {
-            'members_count': CourseMember.objects.filter(course_id=self).count(),
-            'contents_count': CourseContent.objects.filter(course_id=self).count(),
-            'comments_count': Comment.objects.filter(content_id__course_id=self).count(),
+            'members_count': row['enrolled_count'],
+            'contents_count': row['stats__contents'] or 0,
+            'comments_count': row['stats__comments'] or 0,
+            'completions_count': row['stats__completions'] or 0,
         }
 
     class Meta:
         verbose_name = "Mata Kuliah"
         verbose_name_plural = "Data Mata Kuliah"
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["-created_at", "-id"], name="course_created_id_idx")]
 
     def is_member(self, user):
         return CourseMember.objects.filter(course_id=self, user_id=user).exists()
@@ -59,6 +85,27 @@ class CourseMember(models.Model):
         if self.course_id.is_full():
             raise ValidationError("Course has reached its maximum enrollment.")
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if not self._state.adding and update_fields is not None and 'course_id' not in update_fields:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            old = None if self._state.adding else \
+                CourseMember.objects.filter(pk=self.pk).values_list('course_id', flat=True).first()
+            if self._state.adding or old != self.course_id_id:
+                # claim a seat with one conditional UPDATE; the row lock it takes keeps
+                # concurrent enrollments from overshooting max_students
+                claimed = Course.objects.filter(id=self.course_id_id, enrolled_count__lt=F('max_students')) \
+                    .update(enrolled_count=F('enrolled_count') + 1)
+                if not claimed:
+                    raise ValidationError("Course has reached its maximum enrollment.")
+                if old is not None:
+                    # moved to another course, the seat it held there is free again
+                    Course.objects.filter(id=old, enrolled_count__gt=0) \
+                        .update(enrolled_count=F('enrolled_count') - 1)
+            # a duplicate member fails here and rolls the seat back with it
+            super().save(*args, **kwargs)
+
 class CourseContent(models.Model):
     name = models.CharField(max_length=255, verbose_name="Nama Konten")
     description = models.TextField(verbose_name="Deskripsi")
@@ -71,16 +118,118 @@ class CourseContent(models.Model):
     )
     scheduled_start_time = models.DateTimeField("Waktu Mulai", null=True, blank=True)
     scheduled_end_time = models.DateTimeField("Waktu Selesai", null=True, blank=True)
+    # materialized path: the zero-padded ids of the ancestors and the row itself
+    path = models.CharField("Jalur", max_length=250, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Dibuat Pada")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Diperbarui Pada")
 
+    PATH_STEP = 10
+
     class Meta:
         verbose_name = "Konten Mata Kuliah"
         verbose_name_plural = "Konten Mata Kuliah"
+        indexes = [
+            models.Index(fields=["course_id", "path"], name="content_path_idx"),
+            models.Index(fields=["course_id", "scheduled_start_time", "scheduled_end_time"],
+                         name="content_schedule_idx"),
+        ]
 
     def __str__(self):
         return f"{self.course_id.name if self.course_id else 'No Course'} - {self.name}"
 
+    def clean(self):
+        """A parent in the same course, not the row itself or one below it, and not too deep."""
+        super().clean()
+        parent = CourseContent.objects.filter(pk=self.parent_id_id).values('path', 'course_id').first() \
+            if self.parent_id_id else None
+        if parent is None:
+            return
+        if parent['course_id'] != self.course_id_id:
+            raise ValidationError({'parent_id': "Induk konten harus berada di mata kuliah yang sama."})
+        ancestors = CourseContent.ancestor_ids(self.parent_id_id, parent['path'])
+        if self.pk in ancestors:
+            raise ValidationError({'parent_id': "Konten tidak bisa dipindah ke dalam turunannya sendiri."})
+        if (len(ancestors) + 1) * self.PATH_STEP > self._meta.get_field('path').max_length:
+            raise ValidationError({'parent_id': "Struktur konten terlalu dalam."})
+
+    def save(self, *args, **kwargs):
+        """Store the path, moving the rows below along when the parent or course changes; see clean()."""
+        update_fields = kwargs.get('update_fields')
+        if not self._state.adding and update_fields is not None and \
+                not {'parent_id', 'course_id'} & set(update_fields):
+            self._before_save = None
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            old = None if self._state.adding else \
+                CourseContent.objects.filter(pk=self.pk).values('path', 'course_id').first()
+            if old and not old['path']:
+                # bulk inserted and not rebuilt yet: store the paths of the course first, or the
+                # subtree UPDATE below would leave this row's descendants behind
+                for pk in CourseContent.objects.filter(course_id=old['course_id'], path='') \
+                        .values_list('pk', flat=True):
+                    try:
+                        CourseContent.path_of(pk)
+                    except ValidationError:
+                        # a row in a cycle keeps its empty path, as with rebuild_paths
+                        pass
+                old['path'] = CourseContent.objects.filter(pk=self.pk).values_list('path', flat=True).get()
+            # the signals read where the row was, the subtree UPDATE below moves it first
+            self._before_save = old
+            prefix = ''
+            if self.parent_id_id:
+                # a parent bulk inserted and not rebuilt yet gets its path first
+                prefix = CourseContent.objects.filter(pk=self.parent_id_id).values_list('path', flat=True).get() \
+                    or CourseContent.path_of(self.parent_id_id)
+            if old and old['path']:
+                path = prefix + f'{self.pk:0{self.PATH_STEP}d}'
+                if old['path'] != path or old['course_id'] != self.course_id_id:
+                    # move the whole subtree, this row included, with one UPDATE
+                    subtree = CourseContent.subtree(old['course_id'], old['path'])
+                    if old['course_id'] != self.course_id_id:
+                        ContentCompletion.objects.filter(content__in=subtree).update(course_id=self.course_id_id)
+                    subtree.update(path=Concat(Value(path), Substr('path', len(old['path']) + 1)),
+                                   course_id=self.course_id_id)
+                # a loaded copy may hold a path from before a move of its ancestors
+                self.path = path
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'path'}
+                super().save(*args, **kwargs)
+            else:
+                super().save(*args, **kwargs)
+                path = prefix + f'{self.pk:0{self.PATH_STEP}d}'
+                CourseContent.objects.filter(pk=self.pk).update(path=path)
+            self.path = path
+
+    @classmethod
+    def ancestor_ids(cls, pk, path=''):
+        """Ids of `pk` and its ancestors, from its path or, before rebuild_paths, its parents."""
+        if path:
+            return [int(path[i:i + cls.PATH_STEP]) for i in range(0, len(path), cls.PATH_STEP)]
+        ids = []
+        while pk and pk not in ids:
+            ids.append(pk)
+            pk = cls.objects.filter(pk=pk).values_list('parent_id', flat=True).first()
+        return ids
+
+    @classmethod
+    def path_of(cls, pk, seen=()):
+        """The path of `pk`, storing the missing paths of it and its ancestors first."""
+        row = cls.objects.filter(pk=pk).values('path', 'parent_id').get()
+        if row['path']:
+            return row['path']
+        if pk in seen:
+            raise ValidationError("Struktur konten melingkar.")
+        prefix = cls.path_of(row['parent_id'], (*seen, pk)) if row['parent_id'] else ''
+        path = prefix + f'{pk:0{cls.PATH_STEP}d}'
+        cls.objects.filter(pk=pk).update(path=path)
+        return path
+
+    @classmethod
+    def subtree(cls, course_id, path):
+        """The row at `path` and all its descendants, one range scan of the path index."""
+        upper = str(int(path) + 1).zfill(len(path))
+        return cls.objects.filter(course_id=course_id, path__gte=path, path__lt=upper)
+
     def is_available(self):
         now = timezone.now()
         if self.scheduled_start_time and self.scheduled_end_time:
@@ -91,6 +240,18 @@ class CourseContent(models.Model):
             return now <= self.scheduled_end_time
         return True
 
+    @staticmethod
+    def available_at(now):
+        """`is_available` as a filter, an open end of the window counts as open."""
+        return (Q(scheduled_start_time__isnull=True) | Q(scheduled_start_time__lte=now)) & \
+            (Q(scheduled_end_time__isnull=True) | Q(scheduled_end_time__gte=now))
+
+    @classmethod
+    def seconds_to_next_change(cls, course_id):
+        """The available contents of a course change by themselves when one opens or closes."""
+        return seconds_to_next_boundary(cls.objects.filter(course_id=course_id),
+                                        'scheduled_start_time', 'scheduled_end_time')
+
 class Comment(models.Model):
     content_id = models.ForeignKey(CourseContent, verbose_name="konten", on_delete=models.CASCADE)
     member_id = models.ForeignKey(CourseMember, verbose_name="pengguna", on_delete=models.CASCADE)
@@ -102,6 +263,18 @@ class Comment(models.Model):
     class Meta:
         verbose_name = "Komentar"
         verbose_name_plural = "Komentar"
+        # approved-only: the feed never reads unmoderated rows
+        indexes = [models.Index(fields=["content_id", "-created_at", "-id"], name="comment_feed_idx",
+                                condition=models.Q(is_approved=True))]
+
+    @classmethod
+    def feed(cls, content_id):
+        """Approved comments of a content, newest first, with the author in the same query."""
+        author = [f'member_id__user_id__{name}' for name in ('id', 'username', 'first_name', 'last_name')]
+        return (cls.objects.filter(content_id=content_id, is_approved=True)
+                .select_related('member_id__user_id')
+                .only('id', 'comment', 'created_at', *author)
+                .order_by('-created_at', '-id'))
 
     def __str__(self):
         return f"Komen oleh {self.member_id.user_id.username}: {self.comment}"
@@ -109,20 +282,55 @@ class Comment(models.Model):
 class ContentCompletion(models.Model):
     content = models.ForeignKey(CourseContent, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # the content's course, so progress is counted from one index without joining the contents
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, editable=False)
     completed_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('content', 'user')
+        indexes = [models.Index(fields=["course", "user"], name="completion_course_user_idx")]
+
+    def save(self, *args, **kwargs):
+        if self.course_id is None:
+            self.course_id = self.content.course_id_id
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.user.username} completed {self.content.name}'
 
-User.add_to_class('get_course_stats', lambda self: {
-    'courses_as_student': CourseMember.objects.filter(user_id=self, roles='std').count(),
-    'courses_created': Course.objects.filter(teacher=self).count(),
-    'comments_written': Comment.objects.filter(member_id__user_id=self).count(),
-    'contents_completed': ContentCompletion.objects.filter(user=self).count(),
-})
+class CourseStats(models.Model):
+    """Counters of a course, kept up to date by `lms_core.stats`; members are `Course.enrolled_count`."""
+    course = models.OneToOneField(Course, primary_key=True, on_delete=models.CASCADE, related_name='stats')
+    contents = models.PositiveIntegerField("Jumlah Konten", default=0)
+    comments = models.PositiveIntegerField("Jumlah Komentar", default=0)
+    completions = models.PositiveIntegerField("Jumlah Konten Selesai", default=0)
+
+    class Meta:
+        verbose_name = "Statistik Mata Kuliah"
+        verbose_name_plural = "Statistik Mata Kuliah"
+
+class UserStats(models.Model):
+    """Counters of a user, kept up to date by `lms_core.stats`."""
+    user = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name='stats')
+    courses_as_student = models.PositiveIntegerField("Jumlah Course Diikuti", default=0)
+    courses_created = models.PositiveIntegerField("Jumlah Course Dibuat", default=0)
+    comments_written = models.PositiveIntegerField("Jumlah Komentar", default=0)
+    contents_completed = models.PositiveIntegerField("Jumlah Konten Selesai", default=0)
+
+    class Meta:
+        verbose_name = "Statistik Pengguna"
+        verbose_name_plural = "Statistik Pengguna"
+
+def user_course_stats(self):
+    stats = UserStats.objects.filter(user=self).first() or UserStats(user=self)
+    return {
+        'courses_as_student': stats.courses_as_student,
+        'courses_created': stats.courses_created,
+        'comments_written': stats.comments_written,
+        'contents_completed': stats.contents_completed,
+    }
+
+User.add_to_class('get_course_stats', user_course_stats)
 
 class Announcement(models.Model):
     title = models.CharField(max_length=255)
@@ -138,11 +346,23 @@ class Announcement(models.Model):
         return self.title
     
     def is_active(self):
-        return self.start_date <= datetime.now() <= self.end_date
+        return self.start_date <= timezone.now() <= self.end_date
+
+    @classmethod
+    def active(cls, course_id, now):
+        """`is_active` as a query, newest first, on announcement_active_idx."""
+        return cls.objects.filter(course_id=course_id, start_date__lte=now, end_date__gte=now) \
+            .order_by('-start_date')
+
+    @classmethod
+    def seconds_to_next_change(cls, course_id):
+        """The active announcements change by themselves when one starts or ends."""
+        return seconds_to_next_boundary(cls.objects.filter(course_id=course_id), 'start_date', 'end_date')
 
     class Meta:
         verbose_name = "Pengumuman"
         verbose_name_plural = "Pengumuman"
+        indexes = [models.Index(fields=["course", "start_date", "end_date"], name="announcement_active_idx")]
 
     def is_available(self):
         now = timezone.now()
@@ -166,4 +386,34 @@ class Category(models.Model):
 
     class Meta:
         verbose_name = "Kategori"
-        verbose_name_plural = "Kategori"
\ No newline at end of file
+        verbose_name_plural = "Kategori"
+
+class ImportCheckpoint(models.Model):
+    source = models.CharField(max_length=100, unique=True)
+    file_digest = models.CharField(max_length=64, blank=True)
+    rows_done = models.PositiveBigIntegerField(default=0)
+    # rows of this pass whose references could not be resolved yet
+    unresolved = models.PositiveBigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Checkpoint Import"
+        verbose_name_plural = "Checkpoint Import"
+
+    def __str__(self):
+        return f"{self.source} ({self.rows_done} baris)"
+
+
+class ImportRecord(models.Model):
+    source = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    # primary key of the row the import created for this key, None when the row existed already
+    object_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('source', 'key')
+
+    def __str__(self):
+        return f"{self.source}:{self.key}"
@@ -0,0 +1,44 @@
+"""
+The content tree of a course as a materialized path.
+
+Every CourseContent stores in `path` the zero padded ids of its ancestors
+and itself, so ordering by (course_id, path) lists a course depth first
+and a subtree is one range of the `content_path_idx` index.
+`CourseContent.save` keeps the paths right for single writes; bulk writes
+call `rebuild_paths`.
+"""
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+from lms_core.models import CourseContent
+
+
+def segment(step=CourseContent.PATH_STEP):
+    return LPad(Cast('id', CharField()), step, Value('0'))
+
+
+def rebuild_paths(model=CourseContent, course_ids=None):
+    """Recompute the paths of every course, or of `course_ids`, one tree level per UPDATE; returns the number of levels."""
+    rows = model.objects.all()
+    if course_ids is not None:
+        rows = rows.filter(course_id__in=course_ids)
+    rows.update(path='')
+    rows.filter(parent_id__isnull=True).update(path=segment())
+    levels = 1
+    parent_path = model.objects.filter(pk=OuterRef('parent_id')).values('path')[:1]
+    # rows in a cycle never get a parent path and are left empty
+    while rows.filter(path='', parent_id__in=model.objects.exclude(path='')) \
+            .update(path=Concat(Subquery(parent_path), segment())):
+        levels += 1
+    return levels
+
+
+def nest(contents):
+    """Turn contents ordered by path into a forest, each node with a `children` list."""
+    roots, by_id = [], {}
+    for content in contents:
+        content.children = []
+        by_id[content.id] = content
+        parent = by_id.get(content.parent_id_id)
+        (parent.children if parent else roots).append(content)
+    return roots
@@ -0,0 +1,91 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Any, List, Optional
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from ninja import Field, Schema
+from ninja.errors import HttpError
+from ninja.pagination import AsyncPaginationBase
+
+
+class KeysetPagination(AsyncPaginationBase):
+    """
+    Page numbers for the first pages, an opaque keyset cursor for the rest.
+
+    Without `cursor` this behaves like `PageNumberPagination` (`page`, `count`).
+    With `cursor` (empty for the first page) rows are read with
+    `WHERE (created_at, id) < (last created_at, last id)`, so every page
+    costs one index range scan no matter how deep it is. The total is only
+    counted in cursor mode when `total=true` is asked for, and in page mode
+    unless `total=false` is (or, with `count=False`, unless `total=true` is).
+    """
+
+    class Input(Schema):
+        page: int = Field(1, ge=1)
+        page_size: Optional[int] = Field(None, ge=1)
+        cursor: Optional[str] = None
+        total: Optional[bool] = None
+
+    class Output(Schema):
+        items: List[Any]
+        count: Optional[int] = None
+        next: Optional[str] = None
+
+    def __init__(self, page_size=10, max_page_size=100, count=True, **kwargs):
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        self.count = count
+        super().__init__(**kwargs)
+
+    def window(self, queryset, pagination):
+        """The ordered queryset, the slice holding the page plus one row, and whether to count."""
+        page_size = min(pagination.page_size or self.page_size, self.max_page_size)
+        queryset = queryset.order_by('-created_at', '-id')
+        if pagination.cursor is None:
+            offset = (pagination.page - 1) * page_size
+            with_total = self.count if pagination.total is None else pagination.total
+            return queryset, queryset[offset:offset + page_size + 1], page_size, with_total
+        return queryset, self.after(queryset, pagination.cursor)[:page_size + 1], page_size, bool(pagination.total)
+
+    def page(self, rows, page_size, count):
+        items, has_next = rows[:page_size], len(rows) > page_size
+        return {
+            'items': items,
+            'count': count,
+            'next': encode_cursor(items[-1]) if has_next else None,
+        }
+
+    def paginate_queryset(self, queryset, pagination, request, **params):
+        queryset, window, page_size, with_total = self.window(queryset, pagination)
+        return self.page(list(window), page_size, self._items_count(queryset) if with_total else None)
+
+    async def apaginate_queryset(self, queryset, pagination, request, **params):
+        queryset, window, page_size, with_total = self.window(queryset, pagination)
+        rows = [obj async for obj in window]
+        return self.page(rows, page_size, await self._aitems_count(queryset) if with_total else None)
+
+    def after(self, queryset, cursor):
+        if not cursor:
+            return queryset
+        created_at, pk = decode_cursor(cursor)
+        # the plain created_at bound lets the planner seek into the index
+        return queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+                               created_at__lte=created_at)
+
+
+def encode_cursor(obj):
+    position = json.dumps([obj.created_at.isoformat(), obj.id])
+    return urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = json.loads(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        created_at = parse_datetime(created_at)
+        if created_at is None or not isinstance(pk, int):
+            raise ValueError
+    except (ValueError, TypeError, binascii.Error):
+        raise HttpError(400, "Cursor tidak valid")
+    return created_at, pk
@@ -0,0 +1,104 @@
+"""
+Derive the queryset plan of an endpoint from its ninja response schema.
+
+Nested schemas on a forward relation become `select_related`, lists of
+schemas on a reverse or many-to-many relation become `prefetch_related`
+with a planned queryset of their own, and the plain fields narrow the
+SELECT with `only()`. A schema that reads anything which is not a model
+field (a property, a method) loads every column of that model instead.
+"""
+import typing
+from functools import wraps
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet
+from pydantic import BaseModel
+
+
+def inner_schema(annotation):
+    """The schema inside `X`, `Optional[X]` or `list[X]`, and whether it is a list."""
+    origin = typing.get_origin(annotation)
+    if origin in (list, typing.List):
+        inner, _ = inner_schema(typing.get_args(annotation)[0])
+        return inner, True
+    if origin is typing.Union:
+        for arg in typing.get_args(annotation):
+            inner, many = inner_schema(arg)
+            if inner is not None:
+                return inner, many
+        return None, False
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+def _field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # reverse relations are read through their accessor, e.g. `course_set`
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == name:
+                return relation
+        raise
+
+
+def _walk(model, schema, prefix=''):
+    """Yields ('related' | 'only' | 'prefetch', path[, Prefetch])."""
+    for name, info in schema.model_fields.items():
+        try:
+            field = _field(model, name)
+        except FieldDoesNotExist:
+            # a property or method may read any column
+            for concrete in model._meta.concrete_fields:
+                yield 'only', prefix + concrete.name
+            continue
+        path = prefix + name
+        inner, many = inner_schema(info.annotation)
+        if inner is None or not field.is_relation:
+            if field.concrete and not field.many_to_many:
+                yield 'only', path
+        elif many:
+            # the prefetched rows need their foreign key back to this model
+            keep = (field.remote_field.name,) if field.one_to_many else ()
+            yield 'prefetch', path, Prefetch(path, queryset=plan(field.related_model._default_manager.all(),
+                                                                 inner, keep=keep))
+        else:
+            yield 'related', path
+            yield 'only', path
+            yield from _walk(field.related_model, inner, path + '__')
+
+
+def plan(queryset, schema, keep=()):
+    """Apply the select_related/prefetch_related/only plan of `schema` to `queryset`."""
+    schema, _ = inner_schema(schema)
+    related, columns, prefetches = [], list(keep), []
+    for step in _walk(queryset.model, schema):
+        kind, path = step[0], step[1]
+        if kind == 'related':
+            related.append(path)
+        elif kind == 'only':
+            columns.append(path)
+        else:
+            prefetches.append(step[2])
+
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return queryset.only(*dict.fromkeys(columns))
+
+
+def planned(schema):
+    """View decorator: plan the queryset the view returns for `schema`."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            result = view(request, *args, **kwargs)
+            if not isinstance(result, QuerySet):
+                return result
+            # ?fields= / ?expand= (see lms_core.fieldsets) replace the schema's plan
+            fieldset = getattr(request, 'fieldset', None)
+            return fieldset.narrow(result) if fieldset else plan(result, schema)
+        return wrapper
+    return decorator
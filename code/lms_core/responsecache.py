@@ -0,0 +1,100 @@
+"""
+Shared response cache for the hot public reads.
+
+Entries live in the cache alias named by `RESPONSE_CACHE_ALIAS` (any Django
+cache backend: locmem, file, redis, ...), keyed by the full path and the
+current version of every scope the response depends on: `catalog` for the
+course list, `course:<id>` for a course and its contents. The signals in
+`lms_core.signals` replace a scope's version whenever a row of it changes,
+so stale entries are never read again and simply expire after
+`RESPONSE_CACHE_TIMEOUT` seconds, whatever the alias's default.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+VERSION_PREFIX = 'response-version'
+GLOBAL_SCOPE = 'all'
+
+
+def _cache():
+    alias = getattr(settings, 'RESPONSE_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def catalog_scope(request, **kwargs):
+    return 'catalog'
+
+
+def course_scope(request, course_id, **kwargs):
+    return f'course:{course_id}'
+
+
+def _versions(cache, scopes):
+    keys = [f'{VERSION_PREFIX}:{scope}' for scope in (GLOBAL_SCOPE, *scopes)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # a fresh value, never 0: an evicted version must not revive old entries
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def invalidate(*scopes):
+    """Give every scope a new version, now and again once the transaction commits."""
+    cache = _cache()
+    if cache is None or not scopes:
+        return
+
+    def bump():
+        cache.set_many({f'{VERSION_PREFIX}:{scope}': time.time_ns() for scope in scopes}, timeout=None)
+    bump()
+    transaction.on_commit(bump)
+
+
+def invalidate_all():
+    """For writes that skip the model signals (bulk imports, queryset.update)."""
+    invalidate(GLOBAL_SCOPE)
+
+
+def cached(*scopes, timeout=None):
+    """
+    View decorator; `scopes` map the view arguments to the scopes the
+    response depends on. `timeout` is seconds or a callable of the view
+    arguments, `RESPONSE_CACHE_TIMEOUT` when None.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            cache = _cache()
+            if cache is None or request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            versions = _versions(cache, [scope(request, *args, **kwargs) for scope in scopes])
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f'response:{path}:{versions}'
+            response = cache.get(key)
+            if response is not None:
+                response['X-Cache'] = 'HIT'
+                last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+                return get_conditional_response(request, etag=response.get('ETag'),
+                                                last_modified=last_modified, response=response)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                seconds = timeout(request, *args, **kwargs) if callable(timeout) else timeout
+                if seconds is None:
+                    seconds = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+                if seconds > 0:
+                    cache.set(key, response, seconds)
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
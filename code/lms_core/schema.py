@@ -1,5 +1,5 @@
-from ninja import Schema
-from typing import Optional
+from ninja import Field, Schema
+from typing import Literal, Optional
 from datetime import datetime
 
 from django.contrib.auth.models import User
@@ -48,12 +48,23 @@ class CourseContentFull(Schema):
     id: int
     name: str
     description: str
-    video_url: Optional[str]
+    video_url: Optional[str] = None
     file_attachment: Optional[str]
     course_id: CourseSchemaOut
     created_at: datetime
     updated_at: datetime
 
+class ContentOutlineOut(Schema):
+    id: int
+    name: str
+    parent_id: Optional[int] = Field(None, alias='parent_id_id')
+    scheduled_start_time: Optional[datetime] = None
+    scheduled_end_time: Optional[datetime] = None
+    children: list['ContentOutlineOut'] = []
+
+
+ContentOutlineOut.model_rebuild()
+
 class CourseCommentOut(Schema):
     id: int
     content_id: CourseContentMini
@@ -62,5 +73,111 @@ class CourseCommentOut(Schema):
     created_at: datetime
     updated_at: datetime
 
+class CommentAuthorOut(Schema):
+    id: int
+    username: str
+    first_name: str
+    last_name: str
+
+class CommentFeedOut(Schema):
+    id: int
+    comment: str
+    created_at: datetime
+    author: CommentAuthorOut
+
+    @staticmethod
+    def resolve_author(obj):
+        return obj.member_id.user_id
+
 class CourseCommentIn(Schema):
     comment: str
+
+
+class AnnouncementOut(Schema):
+    id: int
+    title: str
+    content: str
+    start_date: datetime
+    end_date: datetime
+
+
+class CourseStatsOut(Schema):
+    members_count: int
+    contents_count: int
+    comments_count: int
+
+
+class CourseAnalyticsOut(Schema):
+    course_id: int
+    name: str
+    members_count: int
+    contents_count: int
+    comments_count: int
+    approved_comments_count: int
+
+
+class CourseProgressOut(Schema):
+    course_id: int
+    name: str
+    completed: int
+    total: int
+    percent: float
+
+
+class StudentProgressOut(Schema):
+    user_id: int
+    username: str
+    completed: int
+    total: int
+    percent: float
+
+
+class CompletionIn(Schema):
+    content_id: Optional[int] = None
+    content_ids: list[int] = Field([], max_length=500)
+
+
+class CompletionAcceptedOut(Schema):
+    accepted: int
+    depth: int
+
+
+class CompletionMetricsOut(Schema):
+    depth: int
+    oldest_ms: float
+    flushes: int
+    written: int
+    failures: int
+    last_flush_ms: float
+    max_flush_ms: float
+    running: bool
+
+
+class BulkEnrollIn(Schema):
+    user_ids: list[int] = Field(..., min_length=1, max_length=5000)
+    roles: Literal['std', 'ast'] = 'std'
+
+
+class EnrollResult(Schema):
+    user_id: int
+    status: str
+
+
+class BulkEnrollOut(Schema):
+    course_id: int
+    enrolled: int
+    results: list[EnrollResult]
+
+
+class SearchHitOut(Schema):
+    kind: Literal['course', 'content', 'comment']
+    id: int
+    course_id: int
+    title: str
+    snippet: str
+    rank: float
+
+
+class SearchOut(Schema):
+    items: list[SearchHitOut]
+    next_page: Optional[int] = None
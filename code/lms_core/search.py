@@ -0,0 +1,150 @@
+"""
+Full-text search over courses, contents and approved comments.
+
+Every searchable row is one document in the `lms_core_search` table,
+keyed by `id * 4 + kind`, with the course it belongs to, a title and a
+body. On SQLite the table is an FTS5 index ranked with bm25; on
+PostgreSQL it holds a generated `tsvector` behind a GIN index, ranked
+with ts_rank. Other backends have no index and `query` returns nothing.
+
+The signals in `lms_core.signals` keep documents in sync on save and
+delete; bulk writes call `reindex` for the rows they wrote, or `rebuild`.
+"""
+import re
+
+from django.db import connection, transaction
+
+from lms_core.models import Comment, Course, CourseContent
+
+TABLE = 'lms_core_search'
+KINDS = {Course: 1, CourseContent: 2, Comment: 3}
+KIND_NAMES = {1: 'course', 2: 'content', 3: 'comment'}
+
+# the documents of every kind as one SELECT of (key, course id, title, body) narrowed by `{rows}`,
+# and the id column it is narrowed on, for `rebuild` and `reindex`
+SOURCES = {
+    Course: ("SELECT id * 4 + 1, id, name, description FROM lms_core_course WHERE {rows}", 'id'),
+    CourseContent: ("SELECT id * 4 + 2, course_id_id, name, description FROM lms_core_coursecontent "
+                    "WHERE {rows}", 'id'),
+    Comment: ("SELECT c.id * 4 + 3, cc.course_id_id, '', c.comment FROM lms_core_comment c "
+              "JOIN lms_core_coursecontent cc ON cc.id = c.content_id_id WHERE c.is_approved AND {rows}", 'c.id'),
+}
+REINDEX_BATCH = 500
+
+
+def supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _key_column():
+    return 'rowid' if connection.vendor == 'sqlite' else 'key'
+
+
+def _document(instance):
+    """(course id, title, body), None when the row is not searchable."""
+    if isinstance(instance, Course):
+        return instance.id, instance.name, instance.description
+    if isinstance(instance, CourseContent):
+        return instance.course_id_id, instance.name, instance.description
+    if instance.is_approved:
+        return instance.content_id.course_id_id, '', instance.comment
+    return None
+
+
+def index(instance):
+    """Write or replace the document of a course, content or comment."""
+    if not supported():
+        return
+    doc = _document(instance)
+    if doc is None:
+        return remove(instance)
+    key = instance.pk * 4 + KINDS[type(instance)]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [key])
+            cursor.execute(f"INSERT INTO {TABLE} (rowid, course_id, title, body) VALUES (%s, %s, %s, %s)",
+                           [key, *doc])
+        else:
+            cursor.execute(f"INSERT INTO {TABLE} (key, course_id, title, body) VALUES (%s, %s, %s, %s) "
+                           "ON CONFLICT (key) DO UPDATE SET course_id = EXCLUDED.course_id, "
+                           "title = EXCLUDED.title, body = EXCLUDED.body", [key, *doc])
+
+
+def remove(instance):
+    if not supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {_key_column()} = %s",
+                       [instance.pk * 4 + KINDS[type(instance)]])
+
+
+def rebuild():
+    """Re-create every document from the source tables, one INSERT ... SELECT per kind, in one transaction."""
+    if not supported():
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        for select, _ in SOURCES.values():
+            cursor.execute(f"INSERT INTO {TABLE} ({_key_column()}, course_id, title, body) "
+                           f"{select.format(rows='1 = 1')}")
+
+
+def reindex(ids):
+    """
+    Re-create the documents of the rows in `ids`, a set of primary keys by
+    model, in one transaction; rows that are gone or not searchable lose theirs.
+    For bulk writes that changed a few rows of large tables.
+    """
+    if not supported():
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model, pks in ids.items():
+            select, column = SOURCES[model]
+            pks = sorted(pks)
+            for start in range(0, len(pks), REINDEX_BATCH):
+                batch = pks[start:start + REINDEX_BATCH]
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(f"DELETE FROM {TABLE} WHERE {_key_column()} IN ({placeholders})",
+                               [pk * 4 + KINDS[model] for pk in batch])
+                cursor.execute(f"INSERT INTO {TABLE} ({_key_column()}, course_id, title, body) "
+                               f"{select.format(rows=f'{column} IN ({placeholders})')}", batch)
+
+
+def terms(text):
+    """The words of a user query, safe to splice into a MATCH or tsquery expression."""
+    return re.findall(r'\w+', text.lower())[:16]
+
+
+def query(text, kind=None, course_id=None, limit=20, offset=0):
+    """
+    Ranked hits, best first, as dicts of kind, id, course_id, title, snippet
+    and rank. Every word has to match; the last one also as a prefix. Equal
+    ranks are ordered by kind and id, so pages neither repeat nor skip hits.
+    """
+    words = terms(text)
+    if not words or not supported():
+        return []
+    filters, params = '', []
+    if kind:
+        filters += f" AND {_key_column()} %% 4 = %s"
+        params.append({name: code for code, name in KIND_NAMES.items()}[kind])
+    if course_id is not None:
+        filters += " AND course_id = %s"
+        params.append(course_id)
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{word}"' for word in words) + '*'
+        sql = (f"SELECT rowid, course_id, title, snippet({TABLE}, -1, '<b>', '</b>', '…', 12), "
+               f"-bm25({TABLE}, 0.0, 5.0, 1.0) AS rank FROM {TABLE} WHERE {TABLE} MATCH %s{filters} "
+               "ORDER BY rank DESC, rowid %% 4, rowid LIMIT %s OFFSET %s")
+    else:
+        match = ' & '.join(words) + ':*'
+        sql = (f"SELECT key, course_id, title, ts_headline('simple', body, q, 'MaxWords=12, MinWords=4'), "
+               f"ts_rank(document, q) AS rank FROM {TABLE}, to_tsquery('simple', %s) q "
+               f"WHERE document @@ q{filters} ORDER BY rank DESC, key %% 4, key LIMIT %s OFFSET %s")
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *params, limit, offset])
+        rows = cursor.fetchall()
+    return [{'kind': KIND_NAMES[key % 4], 'id': key // 4, 'course_id': course, 'title': title,
+             'snippet': snippet, 'rank': rank}
+            for key, course, title, snippet, rank in rows]
@@ -0,0 +1,129 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.db.models import F
+from django.dispatch import receiver
+
+from lms_core import responsecache, search, stats
+from lms_core.models import (Announcement, Category, Comment, ContentCompletion, Course, CourseContent, CourseMember,
+                             CourseStats)
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    responsecache.invalidate('catalog', f'course:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=CourseContent)
+def content_changed(sender, instance, **kwargs):
+    # a row moved to another course leaves the old course's responses stale too
+    before = getattr(instance, '_before_save', None) or {}
+    courses = {instance.course_id_id, before.get('course_id', instance.course_id_id)}
+    responsecache.invalidate(*(f'course:{pk}' for pk in courses))
+
+
+@receiver(post_save, sender=User)
+def teacher_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    # cached course responses embed the teacher's UserOut fields; a teacher cannot be
+    # deleted while teaching (RESTRICT), and logins only write last_login
+    if raw or update_fields is not None and not {'email', 'first_name', 'last_name'} & set(update_fields):
+        return
+    courses = list(Course.objects.filter(teacher=instance).values_list('pk', flat=True))
+    if courses:
+        responsecache.invalidate('catalog', *(f'course:{pk}' for pk in courses))
+
+
+@receiver(pre_save, sender=Announcement)
+def announcement_saving(sender, instance, raw=False, **kwargs):
+    instance._before_course = None if raw or instance._state.adding else \
+        sender.objects.filter(pk=instance.pk).values_list('course_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Announcement)
+def announcement_changed(sender, instance, **kwargs):
+    courses = {instance.course_id, instance.__dict__.pop('_before_course', None) or instance.course_id}
+    responsecache.invalidate(*(f'course:{pk}' for pk in courses))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # on delete the courses are still linked, SET_NULL runs after pre_delete
+    courses = instance.courses.values_list('pk', flat=True)
+    responsecache.invalidate('catalog', *(f'course:{pk}' for pk in courses))
+
+
+@receiver(post_delete, sender=CourseMember)
+def member_deleted(sender, instance, **kwargs):
+    # the seat is claimed in CourseMember.save(), released here
+    Course.objects.filter(id=instance.course_id_id, enrolled_count__gt=0) \
+        .update(enrolled_count=F('enrolled_count') - 1)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=CourseContent)
+@receiver(post_save, sender=Comment)
+def searchable_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index(instance)
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=CourseContent)
+@receiver(post_delete, sender=Comment)
+def searchable_deleted(sender, instance, **kwargs):
+    search.remove(instance)
+
+
+@receiver(post_save, sender=CourseContent)
+def content_moved(sender, instance, raw=False, **kwargs):
+    before = getattr(instance, '_before_save', None)
+    if raw or not before or before['course_id'] == instance.course_id_id:
+        return
+    # the subtree moved with one UPDATE and no signal of its own: carry its counters and documents along
+    contents = CourseContent.subtree(instance.course_id_id, instance.path)
+    comments = Comment.objects.filter(content_id__in=contents)
+    moved = {
+        'contents': contents.count(),
+        'comments': comments.count(),
+        'completions': ContentCompletion.objects.filter(content__in=contents).count(),
+    }
+    for field, count in moved.items():
+        stats.bump(CourseStats, before['course_id'], field, -count)
+        stats.bump(CourseStats, instance.course_id_id, field, count)
+    for row in [*contents, *comments.filter(is_approved=True).select_related('content_id')]:
+        search.index(row)
+
+
+def counted_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._counted = stats.counted_in_db(sender, instance.pk, update_fields)
+
+
+def counted_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = set() if created else instance.__dict__.pop('_counted', None)
+    if before is None:
+        return
+    after = stats.counted(instance)
+    for key in after - before:
+        stats.bump(*key, 1)
+    for key in before - after:
+        stats.bump(*key, -1)
+
+
+def counted_deleting(sender, instance, **kwargs):
+    # read while the related rows of a cascade still exist
+    instance._counted = stats.counted(instance)
+
+
+def counted_deleted(sender, instance, **kwargs):
+    for key in instance.__dict__.pop('_counted', ()):
+        stats.bump(*key, -1)
+
+
+for model in stats.COUNTERS:
+    pre_save.connect(counted_saving, sender=model)
+    post_save.connect(counted_saved, sender=model)
+    pre_delete.connect(counted_deleting, sender=model)
+    post_delete.connect(counted_deleted, sender=model)
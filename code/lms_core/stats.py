@@ -0,0 +1,118 @@
+"""
+Incrementally maintained counters behind the course and user dashboards.
+
+`COUNTERS` says which `CourseStats` / `UserStats` column every row of a
+model adds one to: the lookup path to the counted course or user, and an
+optional filter the row has to match. The signals in `lms_core.signals`
+apply the difference on every save and delete; bulk writes, which skip
+the signals, call `count_created` or `rebuild`. The members of a course are
+not counted here: `Course.enrolled_count` holds them, see `lms_core.enrollment`.
+"""
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from lms_core.models import (Comment, ContentCompletion, Course, CourseContent, CourseMember, CourseStats,
+                             UserStats)
+
+COUNTERS = {
+    CourseMember: [(UserStats, 'user_id', 'courses_as_student', {'roles': 'std'})],
+    Course: [(UserStats, 'teacher', 'courses_created', {})],
+    CourseContent: [(CourseStats, 'course_id', 'contents', {})],
+    Comment: [(CourseStats, 'content_id__course_id', 'comments', {}),
+              (UserStats, 'member_id__user_id', 'comments_written', {})],
+    ContentCompletion: [(CourseStats, 'course', 'completions', {}),
+                        (UserStats, 'user', 'contents_completed', {})],
+}
+
+
+def _resolve(obj, path):
+    """Follow `path` through the instance; the last step reads the raw foreign key."""
+    *steps, last = path.split('__')
+    for step in steps:
+        obj = getattr(obj, step)
+    return getattr(obj, obj._meta.get_field(last).attname)
+
+
+def counted(instance):
+    """The (stats model, pk, column) counters `instance` adds one to."""
+    return {(stats, _resolve(instance, path), field)
+            for stats, path, field, match in COUNTERS[type(instance)]
+            if all(getattr(instance, name) == value for name, value in match.items())}
+
+
+def counted_in_db(model, pk, update_fields=None):
+    """
+    Like `counted`, for the stored version of a row, read with one query.
+    None when `update_fields` leaves every counted column alone.
+    """
+    counters = COUNTERS[model]
+    paths = {path for _, path, _, _ in counters}
+    columns = {path.split('__')[0] for path in paths} | {name for *_, match in counters for name in match}
+    if update_fields is not None and not columns & set(update_fields):
+        return None
+    row = model.objects.filter(pk=pk).values(*paths | columns).first()
+    if row is None:
+        return set()
+    return {(stats, row[path], field) for stats, path, field, match in counters
+            if all(row[name] == value for name, value in match.items())}
+
+
+def bump(stats, pk, field, delta):
+    """Add `delta` to one counter, creating its row on the first increment."""
+    if pk is None or not delta:
+        return
+    if delta < 0:
+        # never below zero, and never create a row for a course or user being deleted
+        stats.objects.filter(pk=pk, **{f'{field}__gte': -delta}).update(**{field: F(field) + delta})
+        return
+    rows = stats.objects.filter(pk=pk)
+    if not rows.update(**{field: F(field) + delta}):
+        stats.objects.bulk_create([stats(pk=pk)], ignore_conflicts=True)
+        rows.update(**{field: F(field) + delta})
+
+
+def count_created(objs):
+    """Count rows inserted with bulk_create, one UPDATE per counter and increment."""
+    deltas = Counter(key for obj in objs for key in counted(obj))
+    groups = defaultdict(list)
+    for (stats, pk, field), delta in deltas.items():
+        groups[stats, field, delta].append(pk)
+    missing = defaultdict(set)
+    for stats, field, delta in groups:
+        missing[stats].update(groups[stats, field, delta])
+    for stats, pks in missing.items():
+        stats.objects.bulk_create([stats(pk=pk) for pk in pks], ignore_conflicts=True)
+    for (stats, field, delta), pks in groups.items():
+        stats.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
+
+
+def count_of(model, path, **match):
+    """Correlated subquery counting the `model` rows whose `path` is the outer row."""
+    rows = (model.objects.filter(**{path: OuterRef('pk')}, **match).order_by()
+            .values(path).annotate(n=Count('pk')).values('n'))
+    return Coalesce(Subquery(rows), Value(0))
+
+
+def rebuild(course_ids=None, user_ids=None):
+    """
+    Recompute the counters from the source tables, one UPDATE per stats table:
+    of every course and user, or of the given `course_ids` / `user_ids`.
+    """
+    owners = {CourseStats: (Course, course_ids), UserStats: (User, user_ids)}
+    for stats, (owner, pks) in owners.items():
+        rows, owner_rows = stats.objects.all(), owner.objects.all()
+        if pks is not None:
+            if not pks:
+                continue
+            rows, owner_rows = rows.filter(pk__in=pks), owner_rows.filter(pk__in=pks)
+        stats.objects.bulk_create([stats(pk=pk) for pk in owner_rows.values_list('pk', flat=True).iterator()],
+                                  ignore_conflicts=True, batch_size=1000)
+        columns = {}
+        for model, counters in COUNTERS.items():
+            for target, path, field, match in counters:
+                if target is stats:
+                    columns[field] = count_of(model, path, **match)
+        rows.update(**columns)
@@ -0,0 +1,50 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from lms_core.models import Category, Comment, Course, CourseContent, CourseMember
+
+
+class CoursesAnalyticsTest(TestCase):
+
+    url = '/api/v1/courses/analytics'
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', password='password123')
+        other = User.objects.create_user(username='other', password='password123')
+        students = [User.objects.create_user(username=f'student{num}', password='password123') for num in range(3)]
+        self.category = Category.objects.create(name="Web")
+        self.courses = [Course.objects.create(name=f"Course {num}", description="", price=100, teacher=self.teacher,
+                                              category=self.category if num else None) for num in range(3)]
+        Course.objects.create(name="Lain", description="", price=100, teacher=other)
+        for num, course in enumerate(self.courses):
+            members = [CourseMember.objects.create(course_id=course, user_id=student) for student in students[:num + 1]]
+            for part in range(2):
+                content = CourseContent.objects.create(course_id=course, name=f"Bab {part}", description="")
+                for member in members:
+                    Comment.objects.create(content_id=content, member_id=member, comment="Mantap",
+                                           is_approved=member.user_id == students[0])
+
+    def headers(self, username):
+        login = self.client.post('/api/v1/auth/sign-in',
+                                 data=json.dumps({'username': username, 'password': 'password123'}),
+                                 content_type='application/json')
+        return {'HTTP_AUTHORIZATION': 'Bearer ' + login.json()['access']}
+
+    def test_counts_in_one_query(self):
+        headers = self.headers('teacher')
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': [course.id for course in self.courses]}, **headers)
+        self.assertEqual(
+            [(row['members_count'], row['contents_count'], row['comments_count'], row['approved_comments_count'])
+             for row in response.json()],
+            [(1, 2, 2, 2), (2, 2, 4, 2), (3, 2, 6, 2)])
+
+    def test_filters_and_scope(self):
+        response = self.client.get(self.url, {'category': self.category.id}, **self.headers('teacher'))
+        self.assertEqual([row['course_id'] for row in response.json()], [course.id for course in self.courses[1:]])
+        # a teacher only sees their own courses
+        response = self.client.get(self.url, {'teacher': self.teacher.id}, **self.headers('other'))
+        self.assertEqual(response.json(), [])
+        self.assertEqual(self.client.get(self.url, **self.headers('teacher')).status_code, 400)
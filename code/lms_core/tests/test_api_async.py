@@ -0,0 +1,58 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from lms_core.models import Announcement, Comment, Course, CourseContent, CourseMember
+
+
+class AsyncReadAPITest(TestCase):
+
+    base_url = '/api/v1/async/'
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', password='password123')
+        self.student = User.objects.create_user(username='student', password='password123')
+        self.course = Course.objects.create(name="Django", description="", price=100, teacher=self.teacher)
+        self.content = CourseContent.objects.create(course_id=self.course, name="Bab 1", description="")
+        member = CourseMember.objects.create(course_id=self.course, user_id=self.student)
+        Comment.objects.create(content_id=self.content, member_id=member, comment="Mantap", is_approved=True)
+        Comment.objects.create(content_id=self.content, member_id=member, comment="Belum", is_approved=False)
+        login = self.client.post('/api/v1/auth/sign-in',
+                                 data=json.dumps({'username': 'student', 'password': 'password123'}),
+                                 content_type='application/json')
+        self.headers = {'Authorization': 'Bearer ' + login.json()['access']}
+
+    async def test_courses(self):
+        response = await self.async_client.get(self.base_url + 'courses')
+        self.assertEqual(response.json()['items'][0]['teacher']['id'], self.teacher.id)
+        response = await self.async_client.get(f'{self.base_url}courses/{self.course.id}')
+        self.assertEqual(response.json()['name'], "Django")
+        response = await self.async_client.get(f'{self.base_url}courses/0')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_contents(self):
+        response = await self.async_client.get(f'{self.base_url}courses/{self.course.id}/contents')
+        self.assertEqual([content['name'] for content in response.json()], ["Bab 1"])
+        response = await self.async_client.get(
+            f'{self.base_url}courses/{self.course.id}/contents/{self.content.id}')
+        self.assertEqual(response.status_code, 200)
+
+    async def test_comments_require_auth_and_are_approved_only(self):
+        url = f'{self.base_url}contents/{self.content.id}/comments'
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual([comment['comment'] for comment in response.json()['items']], ["Mantap"])
+
+    async def test_announcements_and_analytics(self):
+        now = timezone.now()
+        await Announcement.objects.acreate(course=self.course, title="Aktif", content="",
+                                           start_date=now - timedelta(days=1), end_date=now + timedelta(days=1))
+        await Announcement.objects.acreate(course=self.course, title="Lewat", content="",
+                                           start_date=now - timedelta(days=3), end_date=now - timedelta(days=2))
+        response = await self.async_client.get(f'{self.base_url}courses/{self.course.id}/announcements')
+        self.assertEqual([announcement['title'] for announcement in response.json()], ["Aktif"])
+        response = await self.async_client.get(f'{self.base_url}courses/{self.course.id}/analytics')
+        self.assertEqual(response.json(), {'members_count': 1, 'contents_count': 1, 'comments_count': 2})
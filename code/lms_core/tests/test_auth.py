@@ -0,0 +1,47 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from ninja_simple_jwt.jwt.token_operations import get_refresh_token_for_user
+
+from lms_core.auth import verifying_key
+from lms_core.models import Course, CourseMember
+
+
+class JwtClaimsAuthTest(TestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', password='password123')
+        self.admin = User.objects.create_user(username='admin', password='password123', is_staff=True)
+        self.course = Course.objects.create(name="Django", description="", price=100, teacher=self.teacher)
+
+    def token(self, username):
+        login = self.client.post('/api/v1/auth/sign-in',
+                                 data=json.dumps({'username': username, 'password': 'password123'}),
+                                 content_type='application/json')
+        return login.json()['access']
+
+    def test_key_is_parsed_once(self):
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + self.token('teacher')}
+        verifying_key.cache_clear()
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/v1/mycourses', **headers).status_code, 200)
+        self.assertEqual(verifying_key.cache_info().misses, 1)
+
+    def test_rejects_refresh_and_tampered_tokens(self):
+        refresh = get_refresh_token_for_user(self.teacher)[0]
+        response = self.client.get('/api/v1/mycourses', HTTP_AUTHORIZATION='Bearer ' + refresh)
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get('/api/v1/mycourses', HTTP_AUTHORIZATION='Bearer ' + self.token('teacher')[:-2])
+        self.assertEqual(response.status_code, 401)
+
+    def test_claims_and_lazy_user(self):
+        # is_staff comes from the token, the user row is only read to build the response
+        response = self.client.post(f'/api/v1/courses/{self.course.id}/enroll/bulk',
+                                    data=json.dumps({'user_ids': [self.teacher.id]}), content_type='application/json',
+                                    HTTP_AUTHORIZATION='Bearer ' + self.token('admin'))
+        self.assertEqual(response.json()['enrolled'], 1)
+        response = self.client.post(f'/api/v1/courses/{self.course.id}/enroll',
+                                    HTTP_AUTHORIZATION='Bearer ' + self.token('admin'))
+        self.assertEqual(response.json()['user_id']['id'], self.admin.id)
+        self.assertTrue(CourseMember.objects.filter(course_id=self.course, user_id=self.admin).exists())
@@ -0,0 +1,40 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from lms_core import bulkload
+from lms_core.models import Course, CourseContent
+
+
+class BulkLoadTest(TestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher')
+        self.course = Course.objects.create(name="Django for Beginners", description="", price=100,
+                                            teacher=self.teacher)
+
+    def test_insert_fills_defaults_and_nulls(self):
+        written = bulkload.insert(CourseContent, [
+            CourseContent(course_id=self.course, name="Intro", description=""),
+            CourseContent(course_id=self.course, name='Kutip "ganda", koma', description="x"),
+        ], batch_size=1)
+        self.assertEqual(written, 2)
+        intro = CourseContent.objects.get(name="Intro")
+        self.assertEqual(intro.description, "")
+        self.assertIsNone(intro.parent_id)
+        self.assertIsNotNone(intro.created_at)
+        self.assertTrue(CourseContent.objects.filter(name='Kutip "ganda", koma').exists())
+
+    def test_explicit_ids_and_sequence_reset(self):
+        bulkload.insert(CourseContent, [CourseContent(id=500, course_id=self.course, name="A", description="")])
+        bulkload.reset_sequences(CourseContent)
+        content = CourseContent.objects.create(course_id=self.course, name="B", description="")
+        self.assertGreater(content.id, 500)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('bench_bulkload', rows=20, stdout=out)
+        self.assertIn("speedup", out.getvalue())
+        self.assertEqual(CourseContent.objects.count(), 0)
@@ -0,0 +1,64 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from lms_core.models import Comment, Course, CourseContent, CourseMember
+
+
+class CommentFeedTest(TestCase):
+
+    def setUp(self):
+        teacher = User.objects.create_user(username='teacher', password='password123')
+        self.student = User.objects.create_user(username='student', password='password123', first_name="Budi")
+        course = Course.objects.create(name="Django", description="", price=100, teacher=teacher)
+        self.content = CourseContent.objects.create(course_id=course, name="Bab 1", description="")
+        member = CourseMember.objects.create(course_id=course, user_id=self.student)
+        now = timezone.now()
+        Comment.objects.bulk_create(
+            Comment(content_id=self.content, member_id=member, comment=f"Komentar {num}", is_approved=num % 5 != 0,
+                    created_at=now - timedelta(minutes=num // 2))
+            for num in range(45))
+        self.url = f'/api/v1/contents/{self.content.id}/comments'
+        login = self.client.post('/api/v1/auth/sign-in',
+                                 data=json.dumps({'username': 'student', 'password': 'password123'}),
+                                 content_type='application/json')
+        self.headers = {'HTTP_AUTHORIZATION': 'Bearer ' + login.json()['access']}
+
+    def test_feed_walks_approved_comments_newest_first(self):
+        seen = []
+        params = {'cursor': ''}
+        while True:
+            # no count and no user lookup: the page is one query
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url, params, **self.headers).json()
+            seen += [comment['id'] for comment in response['items']]
+            if not response['next']:
+                break
+            params = {'cursor': response['next']}
+        expected = Comment.objects.filter(content_id=self.content, is_approved=True) \
+            .order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+        self.assertEqual(response['items'][0]['author'],
+                         {'id': self.student.id, 'username': 'student', 'first_name': "Budi", 'last_name': ""})
+
+    def test_page_mode_counts_only_on_request(self):
+        self.assertIsNone(self.client.get(self.url, **self.headers).json()['count'])
+        self.assertEqual(self.client.get(self.url, {'total': True}, **self.headers).json()['count'], 36)
+
+    def test_feed_reads_the_index(self):
+        sql, params = Comment.feed(self.content.id)[:21].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('comment_feed_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_legacy_view_pages_with_cursor(self):
+        response = self.client.get(f'/comments/{self.content.id}/')
+        self.assertEqual(len(json.loads(response.json())), 36)
+        self.assertNotIn('X-Next-Cursor', response)
+        self.assertEqual(self.client.get(f'/comments/{self.content.id}/', {'cursor': 'x'}).status_code, 400)
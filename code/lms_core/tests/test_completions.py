@@ -0,0 +1,126 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from lms_core.completions import CompletionBuffer, write
+from lms_core.models import ContentCompletion, Course, CourseContent, CourseMember, CourseStats, UserStats
+
+
+def make_course():
+    teacher = User.objects.create_user(username='teacher', password='password123')
+    student = User.objects.create_user(username='student', password='password123')
+    course = Course.objects.create(name="Django", description="", price=100, teacher=teacher)
+    contents = [CourseContent.objects.create(course_id=course, name=f"Bab {num}", description="") for num in range(5)]
+    return teacher, student, course, contents
+
+
+@override_settings(COMPLETION_FLUSH_SECONDS=0)
+class CompletionApiTest(TestCase):
+
+    def setUp(self):
+        self.teacher, self.student, self.course, self.contents = make_course()
+        User.objects.filter(id=self.teacher.id).update(is_staff=True)
+        CourseMember.objects.create(course_id=self.course, user_id=self.student)
+
+    def headers(self, username):
+        login = self.client.post('/api/v1/auth/sign-in',
+                                 data=json.dumps({'username': username, 'password': 'password123'}),
+                                 content_type='application/json')
+        return {'HTTP_AUTHORIZATION': 'Bearer ' + login.json()['access']}
+
+    def post(self, data):
+        return self.client.post('/api/v1/completions', data=json.dumps(data), content_type='application/json',
+                                **self.headers('student'))
+
+    def test_single_and_batched_events(self):
+        response = self.post({'content_id': self.contents[0].id})
+        self.assertEqual((response.status_code, response.json()), (202, {'accepted': 1, 'depth': 0}))
+        # repeats are dropped, not errors
+        response = self.post({'content_ids': [self.contents[0].id, self.contents[1].id, self.contents[2].id]})
+        self.assertEqual(response.json()['accepted'], 3)
+        self.assertEqual(set(ContentCompletion.objects.values_list('content_id', flat=True)),
+                         {content.id for content in self.contents[:3]})
+        self.assertEqual(CourseStats.objects.get(course=self.course).completions, 3)
+        self.assertEqual(UserStats.objects.get(user=self.student).contents_completed, 3)
+        self.assertEqual(self.post({}).status_code, 400)
+
+    def test_unknown_contents_are_rejected(self):
+        response = self.post({'content_ids': [self.contents[0].id, 0]})
+        self.assertEqual((response.status_code, response.json()['content_ids']), (404, [0]))
+        self.assertFalse(ContentCompletion.objects.exists())
+
+    def test_contents_outside_my_courses_are_not_counted(self):
+        other = Course.objects.create(name="Basis Data", description="", price=100, teacher=self.teacher)
+        foreign = CourseContent.objects.create(course_id=other, name="Bab 1", description="")
+        response = self.post({'content_ids': [self.contents[0].id, foreign.id]})
+        self.assertEqual(response.json()['accepted'], 1)
+        self.assertEqual(list(ContentCompletion.objects.values_list('content_id', flat=True)), [self.contents[0].id])
+        self.assertEqual(CourseStats.objects.get(course=other).completions, 0)
+
+    def test_metrics_for_staff(self):
+        self.post({'content_ids': [content.id for content in self.contents]})
+        response = self.client.get('/api/v1/completions/metrics', **self.headers('teacher')).json()
+        self.assertEqual(response['depth'], 0)
+        self.assertGreaterEqual(response['written'], 5)
+        self.assertEqual(self.client.get('/api/v1/completions/metrics', **self.headers('student')).status_code, 403)
+
+
+class WriteTest(TestCase):
+
+    def setUp(self):
+        _, self.student, self.course, self.contents = make_course()
+
+    def test_counts_only_rows_written(self):
+        ContentCompletion.objects.bulk_create([ContentCompletion(user=self.student, content=self.contents[0],
+                                                                 course=self.course)])
+        self.assertEqual(write({(self.student.id, content.id) for content in self.contents[:2]}), 1)
+        self.assertEqual(write({(self.student.id, self.contents[1].id)}), 0)
+        # the bulk inserted row was never counted, only the one write() stored
+        self.assertEqual(CourseStats.objects.get(course=self.course).completions, 1)
+        self.assertEqual(UserStats.objects.get(user=self.student).contents_completed, 1)
+
+
+class CompletionBufferTest(TransactionTestCase):
+
+    def setUp(self):
+        _, self.student, _, self.contents = make_course()
+        self.buffer = CompletionBuffer()
+        self.addCleanup(self.buffer.stop)
+
+    def wait_for(self, count, seconds=5):
+        # watch the metrics, not the table: the test database locks it while the thread writes
+        deadline = time.monotonic() + seconds
+        while self.buffer.metrics()['written'] < count and time.monotonic() < deadline:
+            time.sleep(0.02)
+        return ContentCompletion.objects.count()
+
+    @override_settings(COMPLETION_BUFFER_SIZE=3, COMPLETION_FLUSH_SECONDS=60)
+    def test_flushes_when_full(self):
+        self.assertEqual(self.buffer.add(self.student.id, [self.contents[0].id, self.contents[1].id]), 2)
+        time.sleep(0.1)
+        self.assertEqual(self.buffer.metrics()['flushes'], 0)
+        self.buffer.add(self.student.id, [self.contents[2].id])
+        self.assertEqual(self.wait_for(3), 3)
+        self.assertEqual(self.buffer.metrics()['flushes'], 1)
+
+    @override_settings(COMPLETION_FLUSH_SECONDS=0.2)
+    def test_flushes_when_old(self):
+        self.buffer.add(self.student.id, [self.contents[0].id])
+        self.assertEqual(self.buffer.metrics()['depth'], 1)
+        self.assertEqual(self.wait_for(1), 1)
+        metrics = self.buffer.metrics()
+        self.assertEqual((metrics['depth'], metrics['written'], metrics['running']), (0, 1, True))
+        self.assertGreater(metrics['last_flush_ms'], 0)
+
+    @override_settings(COMPLETION_FLUSH_SECONDS=60)
+    def test_stop_drains(self):
+        self.buffer.add(self.student.id, [content.id for content in self.contents])
+        self.buffer.stop()
+        self.assertEqual(ContentCompletion.objects.count(), 5)
+        self.assertFalse(self.buffer.metrics()['running'])
+        # after shutdown events are written through
+        ContentCompletion.objects.all().delete()
+        self.assertEqual(self.buffer.add(self.student.id, [self.contents[0].id]), 0)
+        self.assertEqual(ContentCompletion.objects.count(), 1)
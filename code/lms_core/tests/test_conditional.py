@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from lms_core.models import Course, CourseContent
+
+
+# query counts are asserted on uncached responses
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class ConditionalGetTest(TestCase):
+
+    def setUp(self):
+        teacher = User.objects.create_user(username='teacher', password='password123')
+        self.course = Course.objects.create(name="Django", description="", price=100, teacher=teacher)
+        self.content = CourseContent.objects.create(course_id=self.course, name="Bab 1", description="")
+        self.url = f'/api/v1/courses/{self.course.id}/contents'
+
+    def test_matching_etag_answers_304_with_one_query(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_changes_invalidate_validator(self):
+        etag = self.client.get(self.url)['ETag']
+        CourseContent.objects.create(course_id=self.course, name="Bab 2", description="")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(self.url)['ETag']
+        self.course.name = "Django Lanjut"
+        self.course.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['course_id']['name'], "Django Lanjut")
+
+    def test_if_modified_since(self):
+        response = self.client.get(f'/api/v1/courses/{self.course.id}')
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(f'/api/v1/courses/{self.course.id}',
+                                   HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_deleted_row_changes_list_etag(self):
+        etag = self.client.get('/api/v1/courses')['ETag']
+        CourseContent.objects.all().delete()
+        Course.objects.all().delete()
+        self.assertEqual(self.client.get('/api/v1/courses', HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -0,0 +1,162 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from lms_core.enrollment import enroll_users
+from lms_core.models import Course, CourseMember
+
+
+class BulkEnrollTest(TestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', password='password123')
+        self.course = Course.objects.create(name="Django", description="", price=100, teacher=self.teacher,
+                                            max_students=3)
+        self.students = User.objects.bulk_create(User(username=f'student{num}') for num in range(4))
+        self.url = f'/api/v1/courses/{self.course.id}/enroll/bulk'
+
+    def login(self, username):
+        User.objects.filter(username=username).update(password=User.objects.get(pk=self.teacher.pk).password)
+        login = self.client.post('/api/v1/auth/sign-in',
+                                 data=json.dumps({'username': username, 'password': 'password123'}),
+                                 content_type='application/json')
+        return {'HTTP_AUTHORIZATION': 'Bearer ' + login.json()['access']}
+
+    def enroll(self, user_ids, headers):
+        return self.client.post(self.url, data=json.dumps({'user_ids': user_ids}),
+                                content_type='application/json', **headers)
+
+    def test_per_user_results_until_full(self):
+        CourseMember.objects.create(course_id=self.course, user_id=self.students[0])
+        ids = [student.id for student in self.students]
+        response = self.enroll([ids[0], ids[1], ids[1], 0, ids[2], ids[3]], self.login('teacher'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['enrolled'], 2)
+        self.assertEqual([result['status'] for result in response.json()['results']],
+                         ['already_enrolled', 'enrolled', 'duplicate', 'user_not_found', 'enrolled', 'course_full'])
+        self.assertEqual(CourseMember.objects.filter(course_id=self.course).count(), 3)
+
+    def test_query_count_does_not_grow_with_users(self):
+        self.course.max_students = 1000
+        self.course.save()
+        headers = self.login('teacher')
+        users = User.objects.bulk_create(User(username=f'bulk{num}') for num in range(150))
+        # course lookup, savepoint, lock, users, members, insert in its own savepoint,
+        # seat update, stats rows and counters for the users, release
+        with self.assertNumQueries(12):
+            response = self.enroll([user.id for user in users], headers)
+        self.assertEqual(response.json()['enrolled'], 150)
+
+    def test_only_teacher_or_staff(self):
+        response = self.enroll([self.students[0].id], self.login('student1'))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.post('/api/v1/courses/0/enroll/bulk',
+                                          data=json.dumps({'user_ids': [1]}), content_type='application/json',
+                                          **self.login('teacher')).status_code, 404)
+
+    def test_admin_reports_enrolled_and_full(self):
+        admin = User.objects.create_superuser(username='admin', password='password123')
+        self.client.force_login(admin)
+        CourseMember.objects.bulk_create(CourseMember(course_id=self.course, user_id=student)
+                                         for student in self.students[:3])
+        Course.objects.filter(id=self.course.id).update(enrolled_count=3)
+        response = self.client.post('/admin/batch_enroll/', {'course': self.course.id,
+                                                              'students': [self.students[3].id]}, follow=True)
+        self.assertEqual([str(message) for message in response.context['messages']],
+                         ["1 students were not enrolled, the course is full"])
+
+    def test_batch_enroll_view_does_not_count_members_twice(self):
+        admin = User.objects.create_superuser(username='admin', password='password123')
+        self.client.force_login(admin)
+        CourseMember.objects.bulk_create(CourseMember(course_id=self.course, user_id=student)
+                                         for student in self.students[:2])
+        Course.objects.filter(id=self.course.id).update(enrolled_count=2)
+        # two of the three are members already, the third takes the last seat
+        response = self.client.post('/batch_enroll/', {'course': self.course.id,
+                                                       'students': [s.id for s in self.students[:3]]}, follow=True)
+        self.assertEqual([str(message) for message in response.context['messages']],
+                         ["1 students enrolled successfully"])
+        self.assertEqual(Course.objects.get(id=self.course.id).enrolled_count, 3)
+
+    def test_member_inserted_meanwhile_is_already_enrolled(self):
+        # an importer run that does not take the course lock enrolled a user after the
+        # members were read, so the first insert hits the unique key
+        CourseMember.objects.bulk_create([CourseMember(course_id=self.course, user_id=self.students[1])])
+        insert, calls = CourseMember.objects.bulk_create, []
+
+        def racing(objs, *args, **kwargs):
+            calls.append([obj.user_id_id for obj in objs])
+            if len(calls) == 1:
+                raise IntegrityError("UNIQUE constraint failed")
+            return insert(objs, *args, **kwargs)
+
+        with mock.patch.object(CourseMember.objects, 'bulk_create', racing):
+            course, results = enroll_users(self.course.id, [self.students[0].id, self.students[1].id])
+        self.assertEqual(results, [(self.students[0].id, 'enrolled'), (self.students[1].id, 'already_enrolled')])
+        self.assertEqual(calls[-1], [self.students[0].id])
+        self.assertEqual(course.enrolled_count, 1)
+        self.assertEqual(CourseMember.objects.filter(course_id=self.course).count(), 2)
+
+class EnrolledCountTest(TestCase):
+
+    def setUp(self):
+        teacher = User.objects.create_user(username='teacher', password='password123')
+        self.course = Course.objects.create(name="Django", description="", price=100, teacher=teacher,
+                                            max_students=2)
+        self.students = User.objects.bulk_create(User(username=f'student{num}') for num in range(3))
+
+    def enroll(self, user):
+        return self.client.post('/course/enroll_student/', data=json.dumps({'course_id': self.course.id, 'user_id': user.id}),
+                                content_type='application/json')
+
+    def test_seats_claimed_without_counting(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.enroll(self.students[0]).status_code, 201)
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+        self.assertEqual(self.enroll(self.students[0]).json()['error'], "Student is already enrolled in this course")
+        self.assertEqual(self.enroll(self.students[1]).status_code, 201)
+        self.assertEqual(self.enroll(self.students[2]).json()['error'], "Course is full")
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 2)
+        self.assertTrue(self.course.is_full())
+
+    def test_delete_releases_seat(self):
+        member = CourseMember.objects.create(course_id=self.course, user_id=self.students[0])
+        CourseMember.objects.create(course_id=self.course, user_id=self.students[1])
+        member.delete()
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 1)
+        self.assertEqual(self.enroll(self.students[2]).status_code, 201)
+
+    def test_moving_member_moves_seat(self):
+        other = Course.objects.create(name="Basis Data", description="", price=100, teacher=self.course.teacher,
+                                      max_students=1)
+        member = CourseMember.objects.create(course_id=self.course, user_id=self.students[0])
+        CourseMember.objects.create(course_id=other, user_id=self.students[1])
+        member.course_id = other
+        with self.assertRaises(ValidationError):
+            member.save()
+        Course.objects.filter(id=other.id).update(max_students=2)
+        member.save()
+        self.course.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.course.enrolled_count, other.enrolled_count), (0, 2))
+        member.roles = 'ast'
+        member.save()
+        other.refresh_from_db()
+        self.assertEqual(other.enrolled_count, 2)
+
+    def test_reconcile_repairs_drift(self):
+        CourseMember.objects.bulk_create([CourseMember(course_id=self.course, user_id=self.students[0])])
+        out = StringIO()
+        call_command('reconcile_enrollment', stdout=out)
+        self.assertIn("1 courses repaired", out.getvalue())
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 1)
@@ -0,0 +1,55 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from lms_core.models import ContentCompletion, Course, CourseContent, CourseMember
+
+
+class ExportTestCase(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', is_staff=True)
+        self.teacher = User.objects.create(username='teacher')
+        self.student = User.objects.create(username='student')
+        self.course = Course.objects.create(name="Django for Beginners", description="Learn Django from scratch.",
+                                            price=100, teacher=self.teacher)
+        CourseMember.objects.create(course_id=self.course, user_id=self.student)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_requires_staff(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get('/export/courses/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_members_ndjson(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/export/members/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['course_name'], "Django for Beginners")
+        self.assertEqual(rows[0]['username'], 'student')
+
+    def test_export_courses_csv(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/export/courses/?format=csv')
+        lines = self.read(response).splitlines()
+        self.assertTrue(lines[0].startswith('id,name,description,price,teacher_id,teacher_username'))
+        self.assertIn('Django for Beginners', lines[1])
+
+    def test_export_completions_csv(self):
+        content = CourseContent.objects.create(course_id=self.course, name="Bab 1", description="")
+        ContentCompletion.objects.create(content=content, user=self.student)
+        self.client.force_login(self.admin)
+        response = self.client.get('/export/completions/?format=csv')
+        self.assertEqual(response.status_code, 200)
+        lines = self.read(response).splitlines()
+        self.assertEqual(lines[0], 'id,content_id,course_id,user_id,username,completed_at')
+        self.assertTrue(lines[1].startswith(f'{content.contentcompletion_set.get().id},{content.id},{self.course.id},'
+                                            f'{self.student.id},student,'))
+
+    def test_export_unknown_table(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/export/users/').status_code, 404)
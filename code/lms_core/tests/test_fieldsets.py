@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from lms_core.models import Course, CourseContent
+
+
+# query counts are asserted on uncached responses
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class SparseFieldsetTest(TestCase):
+
+    def setUp(self):
+        teacher = User.objects.create_user(username='teacher', first_name='Ani', password='password123')
+        self.course = Course.objects.create(name="Django", description="Belajar Django", price=100,
+                                            teacher=teacher)
+        CourseContent.objects.bulk_create(
+            CourseContent(course_id=self.course, name=f"Bab {num}", description="x" * 100) for num in range(5))
+        self.url = f'/api/v1/courses/{self.course.id}/contents'
+
+    def test_fields_narrow_items_and_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,name'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['items'][0]), {'id', 'name'})
+        # the conditional GET aggregate, then the items
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('description', queries[1]['sql'])
+
+    def test_expand_side_loads_parent_once(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'fields': 'name', 'expand': 'course_id'})
+        data = response.json()
+        self.assertEqual([item['course_id'] for item in data['items']], [self.course.id] * 5)
+        course = data['included']['course_id'][str(self.course.id)]
+        self.assertEqual(course['teacher']['first_name'], 'Ani')
+
+    def test_paginated_endpoint_keeps_page_keys(self):
+        data = self.client.get('/api/v1/courses', {'fields': 'id', 'expand': 'teacher'}).json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['items'], [{'id': self.course.id, 'teacher': self.course.teacher_id}])
+
+    def test_unknown_or_plain_fields_are_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'fields': 'password'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'expand': 'name'}).status_code, 400)
+
+    def test_full_schema_without_parameters(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data[0]['course_id']['name'], "Django")
@@ -0,0 +1,260 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from lms_core import importer
+from lms_core.models import (Course, CourseMember, CourseContent, CourseStats, Comment, ContentCompletion,
+                             ImportCheckpoint, UserStats)
+
+USERS = """firstname,lastname,email,password,username
+Ani,Lestari,ani@example.com,Secret123!,ani
+Budi,Santoso,budi@example.com,Secret123!,budi
+"""
+COURSES = """name,url,description,site,price,teacher
+Django Dasar,https://example.com/django,Belajar Django,Example,100000,1
+"""
+MEMBERS = """course_id,user_id,roles
+1,2,"std"
+1,2,"std"
+"""
+CONTENTS = [{"video_url": "", "course_id": 1, "name": "Intro", "description": "Pengenalan"}]
+COMMENTS = [
+    {"content_id": 1, "user_id": 2, "comment": "Mantap"},
+    {"content_id": 1, "user_id": 1, "comment": "Bukan anggota"},
+]
+
+
+class ImportCommandTest(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name)
+        (self.path / 'user-data.csv').write_text(USERS)
+        (self.path / 'course-data.csv').write_text(COURSES)
+        (self.path / 'member-data.csv').write_text(MEMBERS)
+        (self.path / 'contents.json').write_text(json.dumps(CONTENTS))
+        (self.path / 'comments.json').write_text(json.dumps(COMMENTS))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_import(self, **options):
+        out = StringIO()
+        call_command('import_lms', path=self.path, batch_size=1, stdout=out, **options)
+        return out.getvalue()
+
+    def test_import_resolves_references(self):
+        output = self.run_import()
+        teacher = User.objects.get(username='ani')
+        student = User.objects.get(username='budi')
+        self.assertEqual(Course.objects.get(pk=1).teacher, teacher)
+        self.assertEqual(CourseMember.objects.get().user_id, student)
+        self.assertEqual(CourseContent.objects.get(pk=1).course_id_id, 1)
+        # the second comment's author is not a member of the course
+        self.assertEqual(Comment.objects.get().member_id.user_id, student)
+        self.assertIn("rows/s", output)
+
+    def test_import_completions_when_present(self):
+        (self.path / 'completions.json').write_text(json.dumps([
+            {"content_id": 1, "user_id": 2}, {"content_id": 1, "user_id": 2}, {"content_id": 9, "user_id": 2}]))
+        output = self.run_import()
+        self.assertEqual(ContentCompletion.objects.get().user.username, 'budi')
+        self.assertIn("completions: 3 read, 1 created, 2 skipped", output)
+
+    def test_import_is_repeatable(self):
+        self.run_import()
+        output = self.run_import()
+        self.assertEqual(User.objects.filter(username__in=['ani', 'budi']).count(), 2)
+        self.assertEqual(Course.objects.count(), 1)
+        self.assertEqual(CourseMember.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertIn("members: 2 read, 0 created, 2 skipped", output)
+
+    def test_incremental_import_updates_changed_rows(self):
+        self.run_import(incremental=True)
+        (self.path / 'course-data.csv').write_text(COURSES.replace('100000', '250000'))
+        output = self.run_import(incremental=True)
+        self.assertEqual(Course.objects.get(pk=1).price, 250000)
+        self.assertIn("courses: 1 read, 0 created, 1 updated, 0 skipped", output)
+        # unchanged files are not read again
+        self.assertIn("contents: 0 read", output)
+
+    def test_incremental_import_after_full_import_writes_nothing(self):
+        self.run_import()
+        updated_at = Course.objects.get(pk=1).updated_at
+        self.assertIn("nothing changed", self.run_import(incremental=True))
+        self.assertEqual(Course.objects.get(pk=1).updated_at, updated_at)
+        (self.path / 'course-data.csv').write_text(COURSES.replace('100000', '250000'))
+        self.assertIn("courses: 1 read, 0 created, 1 updated, 0 skipped", self.run_import(incremental=True))
+
+    def test_import_leaves_rows_created_elsewhere_alone(self):
+        teacher = User.objects.create_user(username='cici', password='password123')
+        own = Course.objects.create(id=1, name="Kursus Sendiri", price=5000, teacher=teacher)
+        self.run_import(incremental=True)
+        course = Course.objects.get(name="Django Dasar")
+        self.assertNotEqual(course.pk, own.pk)
+        # references to position 1 resolve to the imported course
+        self.assertEqual(CourseMember.objects.get().course_id, course)
+        self.assertEqual(CourseContent.objects.get().course_id, course)
+        (self.path / 'course-data.csv').write_text(COURSES.replace('100000', '250000'))
+        self.run_import(incremental=True)
+        self.assertEqual(Course.objects.get(pk=course.pk).price, 250000)
+        self.assertEqual(Course.objects.get(pk=own.pk).price, 5000)
+
+    def test_incremental_import_rebuilds_changed_trees_only(self):
+        self.run_import(incremental=True)
+        self.assertEqual(CourseContent.objects.get(pk=1).path, f'{1:010d}')
+        CourseContent.objects.update(path='stale')
+        (self.path / 'course-data.csv').write_text(COURSES.replace('100000', '250000'))
+        self.run_import(incremental=True)
+        self.assertEqual(CourseContent.objects.get(pk=1).path, 'stale')
+        (self.path / 'contents.json').write_text(json.dumps([dict(CONTENTS[0], name="Pembuka")]))
+        self.run_import(incremental=True)
+        self.assertEqual(CourseContent.objects.get(pk=1).path, f'{1:010d}')
+
+    def test_incremental_import_recounts_touched_rows_only(self):
+        self.run_import(incremental=True)
+        course_stats = CourseStats.objects.get(course_id=1)
+        self.assertEqual((course_stats.contents, course_stats.comments), (1, 1))
+        self.assertEqual(UserStats.objects.get(user__username='budi').courses_as_student, 1)
+        UserStats.objects.filter(user__username='ani').update(courses_created=9)
+        # only budi's membership changed, ani's counters are left alone
+        (self.path / 'member-data.csv').write_text(MEMBERS.replace('"std"', '"ast"'))
+        self.run_import(incremental=True)
+        self.assertEqual(UserStats.objects.get(user__username='budi').courses_as_student, 0)
+        self.assertEqual(UserStats.objects.get(user__username='ani').courses_created, 9)
+
+    def test_incremental_import_resumes_from_checkpoint(self):
+        self.run_import(incremental=True)
+        checkpoint = ImportCheckpoint.objects.get(source='members')
+        self.assertEqual(checkpoint.rows_done, 2)
+        # simulate a crash after the first batch of a changed file
+        (self.path / 'member-data.csv').write_text(MEMBERS + '1,1,"ast"\n')
+        checkpoint.file_digest = importer.file_digest(self.path / 'member-data.csv')
+        checkpoint.rows_done = 2
+        checkpoint.completed = False
+        checkpoint.save()
+        output = self.run_import(incremental=True)
+        self.assertIn("members: 1 read, 1 created", output)
+        self.assertEqual(CourseMember.objects.get(user_id__username='ani').roles, 'ast')
+
+
+    def test_incremental_import_retries_unresolved_rows(self):
+        self.run_import(incremental=True)
+        checkpoint = ImportCheckpoint.objects.get(source='comments')
+        self.assertEqual((checkpoint.completed, checkpoint.unresolved), (True, 1))
+        # nothing the comment points at changed, so it is not read again
+        output = self.run_import(incremental=True)
+        self.assertIn("comments: 0 read", output)
+        self.assertIn("nothing changed", output)
+        # the second comment's author joins the course, the comments file is unchanged
+        (self.path / 'member-data.csv').write_text(MEMBERS + '1,1,"ast"\n')
+        output = self.run_import(incremental=True)
+        self.assertIn("comments: 2 read, 1 created, 1 skipped", output)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get(source='comments').unresolved, 0)
+        self.assertIn("comments: 0 read", self.run_import(incremental=True))
+
+    def test_incremental_import_moves_changed_comments(self):
+        (self.path / 'member-data.csv').write_text(MEMBERS + '1,1,"ast"\n')
+        (self.path / 'contents.json').write_text(json.dumps(CONTENTS * 2))
+        self.run_import(incremental=True)
+        comments = [dict(COMMENTS[0], content_id=2, user_id=1), COMMENTS[1]]
+        (self.path / 'comments.json').write_text(json.dumps(comments))
+        self.run_import(incremental=True)
+        comment = Comment.objects.get(pk=1)
+        self.assertEqual((comment.content_id_id, comment.member_id.user_id.username), (2, 'ani'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class GenerateDatasetTest(TestCase):
+
+    def test_generated_dataset_imports(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            out = Path(tmpdir)
+            call_command('generate_dataset', out, scale=1, stdout=StringIO())
+            call_command('import_lms', path=out, workers=1, stdout=StringIO())
+            self.assertEqual(Course.objects.count(), sum(1 for _ in importer.read_csv(out / 'course-data.csv')))
+            self.assertTrue(CourseContent.objects.filter(parent_id__isnull=False).exists())
+            # every content sits in the course of its parent
+            self.assertFalse(CourseContent.objects.exclude(parent_id=None)
+                             .exclude(parent_id__course_id=F('course_id')).exists())
+            self.assertTrue(Comment.objects.exists())
+
+
+class UserProvisioningTest(TestCase):
+
+    def test_hash_passwords_on_pool(self):
+        pool = importer.hash_pool(2)
+        try:
+            hashes = list(importer.hash_passwords(['Secret123!', 'Rahasia456!'], pool))
+        finally:
+            pool.shutdown()
+        self.assertTrue(check_password('Secret123!', hashes[0]))
+        self.assertTrue(check_password('Rahasia456!', hashes[1]))
+
+    def test_existing_users_are_skipped(self):
+        User.objects.create_user(username='ani', password='password123')
+        rows = [{'username': 'ani', 'password': 'x', 'email': '', 'firstname': '', 'lastname': ''},
+                {'username': 'budi', 'password': 'Secret123!', 'email': 'budi@example.com',
+                 'firstname': 'Budi', 'lastname': 'Santoso'},
+                {'username': 'budi', 'password': 'x', 'email': '', 'firstname': '', 'lastname': ''}]
+        result = importer.import_users(importer.numbered(rows), batch_size=1)
+        self.assertEqual((result.created, result.skipped), (1, 2))
+        self.assertTrue(User.objects.get(username='budi').check_password('Secret123!'))
+
+
+class StreamingJsonTest(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmpdir.name) / 'rows.json'
+        self.rows = [{"content_id": num, "comment": "koma, kurung ] dan {kurawal}"} for num in range(20)]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_json_array_across_chunk_boundaries(self):
+        self.file.write_text(json.dumps(self.rows, indent=2))
+        for chunk_size in (1, 7, 1 << 16):
+            self.assertEqual(list(importer.read_json(self.file, chunk_size)), self.rows)
+
+    def test_numbers_across_chunk_boundaries(self):
+        rows = [1.5, 2e3, -0.25, 3E-2, 10, 12.0e+1]
+        self.file.write_text('[1.5, 2e3, -0.25, 3E-2, 10, 12.0e+1]')
+        for chunk_size in range(1, 12):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(importer.read_json(self.file, chunk_size)), rows)
+
+    def test_ndjson(self):
+        self.file.write_text("\n".join(json.dumps(row) for row in self.rows) + "\n")
+        self.assertEqual(list(importer.read_json(self.file, 5)), self.rows)
+
+    def test_truncated_array_raises(self):
+        self.file.write_text('[{"content_id": 1}, {"content_id"')
+        with self.assertRaises(json.JSONDecodeError):
+            list(importer.read_json(self.file, 4))
+
+    def test_invalid_array_raises_with_file_position(self):
+        for text, char in (('[{"a": 1} {"b": 2}]', 10), ('[{"a": 1},, {"b": 2}]', 10),
+                           ('[{"a": 1}]garbage', 10), ('[{"a": 1},]', 10), ('[\n  1,\n  2\n  x]', 13)):
+            self.file.write_text(text)
+            for chunk_size in (1, 3, 1 << 16):
+                with self.subTest(text=text, chunk_size=chunk_size), self.assertRaises(json.JSONDecodeError) as error:
+                    list(importer.read_json(self.file, chunk_size))
+                self.assertEqual(error.exception.pos, char)
+
+    def test_ndjson_after_leading_whitespace_chunks(self):
+        self.file.write_text(" " * 20 + "\n".join(json.dumps(row) for row in self.rows))
+        self.assertEqual(list(importer.read_json(self.file, 4)), self.rows)
+        self.file.write_text('{"a": 1}\n{"b": }\n')
+        with self.assertRaises(json.JSONDecodeError) as error:
+            list(importer.read_json(self.file, 4))
+        self.assertEqual((error.exception.lineno, error.exception.pos), (2, 15))
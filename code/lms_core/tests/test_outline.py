@@ -0,0 +1,105 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+
+from lms_core.models import Course, CourseContent
+from lms_core.outline import rebuild_paths
+
+
+class ContentOutlineTest(TestCase):
+
+    def setUp(self):
+        teacher = User.objects.create_user(username='teacher', password='password123')
+        self.course = Course.objects.create(name="Django", description="", price=100, teacher=teacher)
+        self.other = Course.objects.create(name="Basis Data", description="", price=100, teacher=teacher)
+        self.bab1 = self.add("Bab 1")
+        self.bab2 = self.add("Bab 2")
+        self.sub1 = self.add("Model", self.bab1)
+        self.leaf = self.add("Migrasi", self.sub1)
+        self.sub2 = self.add("View", self.bab1)
+
+    def add(self, name, parent=None):
+        return CourseContent.objects.create(course_id=self.course, name=name, description="", parent_id=parent)
+
+    def outline(self):
+        def names(nodes):
+            return [(node['name'], names(node['children'])) for node in nodes]
+        return names(self.client.get(f'/api/v1/courses/{self.course.id}/outline').json())
+
+    def test_paths_on_insert(self):
+        self.assertEqual(self.leaf.path, f'{self.bab1.id:010d}{self.sub1.id:010d}{self.leaf.id:010d}')
+        self.leaf.refresh_from_db()
+        self.assertEqual(self.leaf.path, f'{self.bab1.id:010d}{self.sub1.id:010d}{self.leaf.id:010d}')
+
+    def test_outline_is_one_query(self):
+        with self.assertNumQueries(1):
+            outline = self.outline()
+        self.assertEqual(outline, [("Bab 1", [("Model", [("Migrasi", [])]), ("View", [])]), ("Bab 2", [])])
+
+    def test_move_carries_the_subtree(self):
+        stale = CourseContent.objects.get(id=self.leaf.id)
+        self.sub1.parent_id = self.bab2
+        self.sub1.save()
+        self.assertEqual(self.outline(), [("Bab 1", [("View", [])]), ("Bab 2", [("Model", [("Migrasi", [])])])])
+        # a copy loaded before the move must not write its old path back
+        stale.name = "Migrasi Data"
+        stale.save()
+        self.leaf.refresh_from_db()
+        self.assertEqual(self.leaf.path, f'{self.bab2.id:010d}{self.sub1.id:010d}{self.leaf.id:010d}')
+
+    def test_invalid_moves(self):
+        self.bab1.parent_id = self.leaf
+        with self.assertRaisesMessage(ValidationError, "turunannya sendiri"):
+            self.bab1.clean()
+        self.leaf.parent_id = CourseContent.objects.create(course_id=self.other, name="Lain", description="")
+        with self.assertRaisesMessage(ValidationError, "mata kuliah yang sama"):
+            self.leaf.clean()
+
+    def test_save_keeps_the_fields_it_is_given(self):
+        self.sub1.name = "Model Data"
+        self.sub1.parent_id = self.bab2
+        self.sub1.save(update_fields=['parent_id'])
+        sub1 = CourseContent.objects.get(id=self.sub1.id)
+        self.assertEqual((sub1.name, sub1.path), ("Model", f'{self.bab2.id:010d}{self.sub1.id:010d}'))
+        # without update_fields every field is written
+        self.sub1.save()
+        self.assertEqual(CourseContent.objects.get(id=self.sub1.id).name, "Model Data")
+
+    def test_subtree_is_a_range_scan(self):
+        response = self.client.get(f'/api/v1/courses/{self.course.id}/contents/{self.sub1.id}/subtree').json()
+        self.assertEqual((response['name'], [child['name'] for child in response['children']]),
+                         ("Model", ["Migrasi"]))
+        self.assertEqual(set(CourseContent.subtree(self.course.id, self.bab1.path).values_list('id', flat=True)),
+                         {self.bab1.id, self.sub1.id, self.leaf.id, self.sub2.id})
+        sql, params = CourseContent.subtree(self.course.id, self.bab1.path).order_by('path').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('content_path_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_parent_without_path(self):
+        # as left by a bulk insert before rebuild_paths
+        CourseContent.objects.update(path='')
+        child = self.add("Relasi", self.sub1)
+        self.assertEqual(child.path, f'{self.bab1.id:010d}{self.sub1.id:010d}{child.id:010d}')
+        self.assertEqual(CourseContent.objects.get(id=self.sub1.id).path, f'{self.bab1.id:010d}{self.sub1.id:010d}')
+        self.bab1.refresh_from_db()
+        self.bab1.parent_id = self.leaf
+        with self.assertRaisesMessage(ValidationError, "turunannya sendiri"):
+            self.bab1.clean()
+        # a whole unrebuilt subtree moves to another course with its root
+        CourseContent.objects.update(path='')
+        self.bab1.refresh_from_db()
+        self.bab1.course_id = self.other
+        self.bab1.save()
+        moved = dict(CourseContent.objects.filter(course_id=self.other).values_list('id', 'path'))
+        self.assertEqual(set(moved), {self.bab1.id, self.sub1.id, self.leaf.id, self.sub2.id, child.id})
+        self.assertEqual(moved[self.leaf.id], f'{self.bab1.id:010d}{self.sub1.id:010d}{self.leaf.id:010d}')
+
+    def test_rebuild_paths(self):
+        expected = dict(CourseContent.objects.values_list('id', 'path'))
+        CourseContent.objects.update(path='')
+        self.assertEqual(rebuild_paths(), 3)
+        self.assertEqual(dict(CourseContent.objects.values_list('id', 'path')), expected)
@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from lms_core.models import Course
+
+
+# the catalog is written with bulk queries that skip the cache signals
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class CourseCursorPaginationTest(TestCase):
+
+    url = '/api/v1/courses'
+
+    def setUp(self):
+        teacher = User.objects.create_user(username='teacher', password='password123')
+        Course.objects.bulk_create(
+            Course(name=f"Course {num}", description="", price=100, teacher=teacher) for num in range(25))
+        # half the catalog shares one timestamp, so the id has to break ties
+        now = timezone.now()
+        for num, course in enumerate(Course.objects.order_by('id')):
+            Course.objects.filter(pk=course.pk).update(created_at=now - timedelta(minutes=num // 2))
+
+    def test_cursor_walks_whole_catalog(self):
+        seen = []
+        response = self.client.get(self.url, {'cursor': '', 'page_size': 7}).json()
+        self.assertIsNone(response['count'])
+        while True:
+            seen += [course['id'] for course in response['items']]
+            if not response['next']:
+                break
+            response = self.client.get(self.url, {'cursor': response['next'], 'page_size': 7}).json()
+        expected = list(Course.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_page_mode_counts_and_hands_out_cursor(self):
+        response = self.client.get(self.url, {'page': 3}).json()
+        self.assertEqual(response['count'], 25)
+        self.assertEqual(len(response['items']), 5)
+        self.assertIsNone(response['next'])
+        first = self.client.get(self.url).json()
+        following = self.client.get(self.url, {'cursor': first['next'], 'total': True}).json()
+        self.assertEqual(following['count'], 25)
+        self.assertEqual(following['items'], self.client.get(self.url, {'page': 2}).json()['items'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'bukan-cursor'})
+        self.assertEqual(response.status_code, 400)
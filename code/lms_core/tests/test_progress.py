@@ -0,0 +1,59 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from lms_core.models import ContentCompletion, Course, CourseContent, CourseMember
+
+
+class ProgressTest(TestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', password='password123')
+        self.budi = User.objects.create_user(username='budi', password='password123')
+        self.sari = User.objects.create_user(username='sari', password='password123')
+        self.course = Course.objects.create(name="Django", description="", price=100, teacher=self.teacher)
+        self.other = Course.objects.create(name="Basis Data", description="", price=100, teacher=self.teacher)
+        self.contents = [CourseContent.objects.create(course_id=self.course, name=f"Bab {num}", description="")
+                         for num in range(4)]
+        other = CourseContent.objects.create(course_id=self.other, name="Bab 1", description="")
+        for user in (self.budi, self.sari):
+            CourseMember.objects.create(course_id=self.course, user_id=user)
+        CourseMember.objects.create(course_id=self.other, user_id=self.budi)
+        CourseMember.objects.create(course_id=self.course, user_id=self.teacher, roles='ast')
+        for content in self.contents[:3] + [other]:
+            ContentCompletion.objects.create(content=content, user=self.budi)
+        ContentCompletion.objects.create(content=self.contents[0], user=self.sari)
+
+    def headers(self, username):
+        login = self.client.post('/api/v1/auth/sign-in',
+                                 data=json.dumps({'username': username, 'password': 'password123'}),
+                                 content_type='application/json')
+        return {'HTTP_AUTHORIZATION': 'Bearer ' + login.json()['access']}
+
+    def test_my_progress(self):
+        headers = self.headers('budi')
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/mycourses/progress', **headers).json()
+        self.assertEqual(response, [
+            {'course_id': self.course.id, 'name': "Django", 'completed': 3, 'total': 4, 'percent': 75.0},
+            {'course_id': self.other.id, 'name': "Basis Data", 'completed': 1, 'total': 1, 'percent': 100.0},
+        ])
+
+    def test_course_progress_for_the_teacher(self):
+        url = f'/api/v1/courses/{self.course.id}/progress'
+        headers = self.headers('teacher')
+        with self.assertNumQueries(3):
+            response = self.client.get(url, **headers).json()
+        self.assertEqual([(row['username'], row['completed'], row['percent']) for row in response],
+                         [("budi", 3, 75.0), ("sari", 1, 25.0)])
+        self.assertEqual(self.client.get(url, **self.headers('budi')).status_code, 403)
+        self.assertEqual(self.client.get('/api/v1/courses/0/progress', **headers).status_code, 404)
+
+    def test_completion_follows_its_content(self):
+        completion = ContentCompletion.objects.get(content=self.contents[1])
+        self.assertEqual(completion.course_id, self.course.id)
+        self.contents[1].course_id = self.other
+        self.contents[1].save()
+        completion.refresh_from_db()
+        self.assertEqual(completion.course_id, self.other.id)
@@ -0,0 +1,74 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from ninja import Schema
+
+from lms_core.models import Course, CourseContent, CourseMember
+from lms_core.queryplan import plan
+from lms_core.schema import CourseMemberOut, CourseSchemaOut
+
+
+class TeacherCourses(Schema):
+    id: int
+    username: str
+    course_set: list[CourseSchemaOut]
+
+
+# query counts are asserted on uncached responses
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class QueryPlanTest(TestCase):
+
+    base_url = '/api/v1/'
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='student', password='password123')
+        login = self.client.post(self.base_url + 'auth/sign-in',
+                                 data=json.dumps({'username': 'student', 'password': 'password123'}),
+                                 content_type='application/json')
+        self.headers = {'HTTP_AUTHORIZATION': 'Bearer ' + login.json()['access']}
+
+    def add_courses(self, count):
+        for num in range(count):
+            teacher = User.objects.create_user(username=f'teacher{Course.objects.count()}')
+            course = Course.objects.create(name=f"Course {num}", description="", price=100, teacher=teacher)
+            CourseMember.objects.create(course_id=course, user_id=self.student)
+            CourseContent.objects.create(course_id=course, name=f"Content {num}", description="")
+        return course
+
+    def test_list_endpoints_run_constant_queries(self):
+        for count in (1, 5):
+            course = self.add_courses(count)
+            # the user comes from the token claims, not from a query
+            with self.assertNumQueries(1):
+                response = self.client.get(self.base_url + 'mycourses', **self.headers)
+            self.assertEqual(response.status_code, 200)
+            # plus one aggregate for the conditional GET validator
+            with self.assertNumQueries(3):
+                self.client.get(self.base_url + 'courses')
+            CourseContent.objects.bulk_create(
+                CourseContent(course_id=course, name="Extra", description="") for _ in range(count))
+            with self.assertNumQueries(2):
+                response = self.client.get(f'{self.base_url}courses/{course.id}/contents')
+            self.assertEqual(response.json()[0]['course_id']['teacher']['id'], course.teacher_id)
+
+    def test_plan_narrows_columns(self):
+        sql = str(plan(CourseMember.objects.all(), CourseMemberOut).query)
+        self.assertNotIn('password', sql)
+        self.assertNotIn('max_students', sql)
+        self.assertIn('"lms_core_course"."name"', sql)
+
+    def test_plan_prefetches_reverse_relations(self):
+        self.add_courses(3)
+        with self.assertNumQueries(2):
+            teachers = [TeacherCourses.from_orm(user).dict()
+                        for user in plan(User.objects.exclude(pk=self.student.pk), TeacherCourses)]
+        self.assertEqual(sum(len(teacher['course_set']) for teacher in teachers), 3)
+
+    def test_detail_content(self):
+        course = self.add_courses(1)
+        content = CourseContent.objects.get(course_id=course)
+        with self.assertNumQueries(2):
+            response = self.client.get(f'{self.base_url}courses/{course.id}/contents/{content.id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['video_url'])
@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from lms_core.models import Announcement, Category, Course, CourseContent
+
+
+class ResponseCacheTest(TestCase):
+
+    def setUp(self):
+        caches['responses'].clear()
+        self.teacher = User.objects.create_user(username='teacher', password='password123')
+        self.course = Course.objects.create(name="Django", description="", price=100, teacher=self.teacher)
+        CourseContent.objects.create(course_id=self.course, name="Bab 1", description="")
+        self.url = f'/api/v1/courses/{self.course.id}/contents'
+
+    def test_second_read_is_served_from_cache(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json()[0]['name'], "Bab 1")
+
+    def test_cached_etag_answers_304(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_content_change_invalidates_only_its_course(self):
+        other = Course.objects.create(name="Flask", description="", price=100, teacher=self.teacher)
+        other_url = f'/api/v1/courses/{other.id}'
+        self.client.get(self.url)
+        self.client.get(other_url)
+        CourseContent.objects.create(course_id=self.course, name="Bab 2", description="")
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(self.client.get(other_url)['X-Cache'], 'HIT')
+
+    def test_content_detail_is_cached_per_course(self):
+        content = CourseContent.objects.get(course_id=self.course)
+        url = f'{self.url}/{content.id}'
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        content.name = "Pendahuluan"
+        content.save()
+        response = self.client.get(url)
+        self.assertEqual((response['X-Cache'], response.json()['name']), ('MISS', "Pendahuluan"))
+        other = Course.objects.create(name="Flask", description="", price=100, teacher=self.teacher)
+        self.assertEqual(self.client.get(f'/api/v1/courses/{other.id}/contents/{content.id}').status_code, 404)
+
+    def test_move_invalidates_both_courses(self):
+        other = Course.objects.create(name="Flask", description="", price=100, teacher=self.teacher)
+        now = timezone.now()
+        announcement = Announcement.objects.create(course=self.course, title="Ujian", content="",
+                                                   start_date=now - timedelta(hours=1),
+                                                   end_date=now + timedelta(hours=1))
+        announcements = f'/api/v1/courses/{self.course.id}/announcements'
+        self.client.get(self.url)
+        self.client.get(announcements)
+        content = CourseContent.objects.get(course_id=self.course)
+        content.course_id = other
+        content.save()
+        response = self.client.get(self.url)
+        self.assertEqual((response['X-Cache'], response.json()), ('MISS', []))
+        announcement.course = other
+        announcement.save()
+        response = self.client.get(announcements)
+        self.assertEqual((response['X-Cache'], response.json()), ('MISS', []))
+
+    def test_course_and_category_changes_invalidate_catalog(self):
+        self.client.get('/api/v1/courses')
+        self.course.name = "Django Lanjut"
+        self.course.save()
+        response = self.client.get('/api/v1/courses')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['items'][0]['name'], "Django Lanjut")
+
+        category = Category.objects.create(name="Web", created_by=self.teacher)
+        self.assertEqual(self.client.get('/api/v1/courses')['X-Cache'], 'MISS')
+        category.delete()
+        self.assertEqual(self.client.get('/api/v1/courses')['X-Cache'], 'MISS')
+
+    def test_teacher_change_invalidates_their_courses(self):
+        detail = f'/api/v1/courses/{self.course.id}'
+        self.client.get('/api/v1/courses')
+        self.client.get(detail)
+        # a login only writes last_login
+        self.client.login(username='teacher', password='password123')
+        self.assertEqual(self.client.get(detail)['X-Cache'], 'HIT')
+        self.teacher.first_name = "Ani"
+        self.teacher.save()
+        response = self.client.get(detail)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['teacher']['first_name'], "Ani")
+        self.assertEqual(self.client.get('/api/v1/courses')['X-Cache'], 'MISS')
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_timeout_comes_from_settings(self):
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get('/api/v1/courses')
+        self.assertEqual(self.client.get('/api/v1/courses', {'page': 2})['X-Cache'], 'MISS')
+
+    def test_legacy_listing_expires_at_next_schedule(self):
+        CourseContent.objects.create(course_id=self.course, name="Bab 3", description="",
+                                     scheduled_start_time=timezone.now() - timedelta(hours=1),
+                                     scheduled_end_time=timezone.now() + timedelta(seconds=30))
+        url = f'/course_contents/{self.course.id}/'
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        self.assertLessEqual(CourseContent.seconds_to_next_change(self.course.id), 31)
+        self.assertIsNone(CourseContent.seconds_to_next_change(0))
+
+    @override_settings(RESPONSE_CACHE_ALIAS=None)
+    def test_cache_can_be_disabled(self):
+        self.client.get(self.url)
+        self.assertNotIn('X-Cache', self.client.get(self.url))
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from lms_core.models import Announcement, Course, CourseContent
+from lms_core.responsecache import invalidate_all
+
+
+class ContentAvailabilityTest(TestCase):
+
+    def setUp(self):
+        invalidate_all()
+        teacher = User.objects.create_user(username='teacher', password='password123')
+        self.course = Course.objects.create(name="Django", description="", price=100, teacher=teacher)
+        now = timezone.now()
+        hour = timedelta(hours=1)
+        windows = {
+            "Terbuka": (now - hour, now + hour),
+            "Selesai": (now - 2 * hour, now - hour),
+            "Belum Mulai": (now + hour, None),
+            "Tanpa Akhir": (now - hour, None),
+            "Tanpa Jadwal": (None, None),
+        }
+        for name, (start, end) in windows.items():
+            CourseContent.objects.create(course_id=self.course, name=name, description="",
+                                         scheduled_start_time=start, scheduled_end_time=end)
+        self.url = f'/course_contents/{self.course.id}/'
+
+    def test_availability_is_computed_in_sql(self):
+        with self.assertNumQueries(2):
+            contents = self.client.get(self.url).json()
+        self.assertEqual({content['name']: content['is_available'] for content in contents},
+                         {"Terbuka": True, "Selesai": False, "Tanpa Akhir": True, "Tanpa Jadwal": True})
+        self.assertEqual(contents[0]['course'], {'id': self.course.id, 'name': "Django"})
+        # the SQL flag agrees with the model method
+        available = CourseContent.objects.filter(CourseContent.available_at(timezone.now()))
+        self.assertEqual({content.name for content in available},
+                         {content.name for content in CourseContent.objects.all() if content.is_available()})
+
+    def test_cached_until_the_next_boundary(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+
+    def test_reads_the_schedule_index(self):
+        now = timezone.now()
+        sql, params = CourseContent.objects.filter(course_id=self.course.id) \
+            .filter(CourseContent.available_at(now)).values('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('content_schedule_idx', plan)
+
+
+class ActiveAnnouncementTest(TestCase):
+
+    def setUp(self):
+        invalidate_all()
+        teacher = User.objects.create_user(username='teacher', password='password123')
+        self.course = Course.objects.create(name="Django", description="", price=100, teacher=teacher)
+        now = timezone.now()
+        hour = timedelta(hours=1)
+        for title, start, end in [("Lama", now - 3 * hour, now - 2 * hour), ("Aktif", now - 2 * hour, now + hour),
+                                  ("Baru", now - hour, now + 2 * hour), ("Nanti", now + hour, now + 2 * hour)]:
+            Announcement.objects.create(course=self.course, title=title, content="", start_date=start, end_date=end)
+        self.url = f'/api/v1/courses/{self.course.id}/announcements'
+
+    def test_active_in_sql_newest_first(self):
+        self.assertEqual([item['title'] for item in self.client.get(self.url).json()], ["Baru", "Aktif"])
+        self.assertEqual([item['title'] for item in self.client.get(f'/course/{self.course.id}/announcement/show/').json()],
+                         ["Baru", "Aktif"])
+        self.assertEqual({item.title for item in Announcement.objects.all() if item.is_active()}, {"Baru", "Aktif"})
+
+    def test_cached_until_the_next_boundary(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+        Announcement.objects.filter(title="Nanti").get().delete()
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        self.assertLessEqual(Announcement.seconds_to_next_change(self.course.id), 3601)
+        self.assertIsNone(Announcement.seconds_to_next_change(0))
+
+    def test_reads_the_announcement_index(self):
+        sql, params = Announcement.active(self.course.id, timezone.now()).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('announcement_active_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
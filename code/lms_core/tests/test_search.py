@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from lms_core import search
+from lms_core.models import Comment, Course, CourseContent, CourseMember
+
+
+class SearchTest(TestCase):
+
+    url = '/api/v1/search'
+
+    def setUp(self):
+        teacher = User.objects.create_user(username='teacher', password='password123')
+        student = User.objects.create_user(username='student', password='password123')
+        self.course = Course.objects.create(name="Pemrograman Django", description="Membangun web dengan Python",
+                                            price=100, teacher=teacher)
+        self.other = Course.objects.create(name="Basis Data", description="Query dan index untuk Django",
+                                           price=100, teacher=teacher)
+        self.content = CourseContent.objects.create(course_id=self.course, name="Model dan Migrasi",
+                                                    description="Membuat model Django")
+        member = CourseMember.objects.create(course_id=self.course, user_id=student)
+        self.comment = Comment.objects.create(content_id=self.content, member_id=member,
+                                              comment="Penjelasan migrasi sangat jelas", is_approved=True)
+        Comment.objects.create(content_id=self.content, member_id=member, comment="migrasi spam", is_approved=False)
+
+    def hits(self, **params):
+        return [(hit['kind'], hit['id']) for hit in self.client.get(self.url, params).json()['items']]
+
+    def test_ranked_hits_across_kinds(self):
+        # a title match outranks a body match
+        self.assertEqual(self.hits(q="django"),
+                         [('course', self.course.id), ('content', self.content.id), ('course', self.other.id)])
+        self.assertEqual(self.hits(q="migr"), [('content', self.content.id), ('comment', self.comment.id)])
+        self.assertEqual(self.hits(q="django", kind='course', course=self.other.id), [('course', self.other.id)])
+        self.assertEqual(self.hits(q='"; DROP'), [])
+
+    def test_index_follows_writes(self):
+        self.content.name = "Relasi Antar Tabel"
+        self.content.description = ""
+        self.content.save()
+        self.assertEqual(self.hits(q="migrasi"), [('comment', self.comment.id)])
+        self.comment.is_approved = False
+        self.comment.save()
+        self.assertEqual(self.hits(q="migrasi"), [])
+        self.other.delete()
+        self.assertEqual(self.hits(q="basis"), [])
+
+    def test_pages(self):
+        CourseContent.objects.bulk_create(
+            CourseContent(course_id=self.course, name=f"Latihan {num}", description="") for num in range(25))
+        call_command('rebuild_search', stdout=StringIO())
+        first = self.client.get(self.url, {'q': "latihan", 'page_size': 20}).json()
+        self.assertEqual((len(first['items']), first['next_page']), (20, 2))
+        second = self.client.get(self.url, {'q': "latihan", 'page_size': 20, 'page': 2}).json()
+        self.assertEqual((len(second['items']), second['next_page']), (5, None))
+        # the 25 hits rank the same, the pages still cover each of them once
+        ids = [hit['id'] for hit in first['items'] + second['items']]
+        self.assertEqual(ids, sorted(CourseContent.objects.filter(name__startswith="Latihan")
+                                     .values_list('id', flat=True)))
+
+    def test_reindex_rows(self):
+        CourseContent.objects.filter(id=self.content.id).update(name="Relasi", description="")
+        Comment.objects.filter(id=self.comment.id).update(is_approved=False)
+        # bulk writes skip the signals, the documents are stale until reindexed
+        self.assertEqual(self.hits(q="migrasi"), [('content', self.content.id), ('comment', self.comment.id)])
+        search.reindex({CourseContent: {self.content.id}, Comment: {self.comment.id}})
+        self.assertEqual(self.hits(q="migrasi"), [])
+        self.assertEqual(self.hits(q="relasi"), [('content', self.content.id)])
+        self.assertEqual(self.hits(q="django", kind='course'), [('course', self.course.id), ('course', self.other.id)])
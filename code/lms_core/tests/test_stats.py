@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from lms_core import search
+from lms_core.models import Comment, ContentCompletion, Course, CourseContent, CourseMember, CourseStats, UserStats
+
+
+class StatsCountersTest(TestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', password='password123')
+        self.student = User.objects.create_user(username='student', password='password123')
+        self.course = Course.objects.create(name="Django", description="", price=100, teacher=self.teacher)
+        self.member = CourseMember.objects.create(course_id=self.course, user_id=self.student)
+        self.content = CourseContent.objects.create(course_id=self.course, name="Bab 1", description="")
+        self.comment = Comment.objects.create(content_id=self.content, member_id=self.member, comment="Mantap")
+        ContentCompletion.objects.create(content=self.content, user=self.student)
+
+    def test_counters_follow_writes(self):
+        self.assertEqual(self.course.get_course_stats(),
+                         {'members_count': 1, 'contents_count': 1, 'comments_count': 1, 'completions_count': 1})
+        self.assertEqual(self.student.get_course_stats(),
+                         {'courses_as_student': 1, 'courses_created': 0, 'comments_written': 1,
+                          'contents_completed': 1})
+        self.assertEqual(self.teacher.get_course_stats()['courses_created'], 1)
+
+        self.member.roles = 'ast'
+        self.member.save()
+        self.comment.delete()
+        self.content.delete()
+        self.assertEqual(self.course.get_course_stats(),
+                         {'members_count': 1, 'contents_count': 0, 'comments_count': 0, 'completions_count': 0})
+        self.assertEqual(self.student.get_course_stats(),
+                         {'courses_as_student': 0, 'courses_created': 0, 'comments_written': 0,
+                          'contents_completed': 0})
+
+    def test_content_moved_to_another_course(self):
+        other = Course.objects.create(name="Basis Data", description="", price=100, teacher=self.teacher)
+        self.comment.is_approved = True
+        self.comment.save()
+        child = CourseContent.objects.create(course_id=self.course, name="Bab 1.1", description="",
+                                             parent_id=self.content)
+        self.content.course_id = other
+        self.content.save()
+        self.assertEqual(self.course.get_course_stats(),
+                         {'members_count': 1, 'contents_count': 0, 'comments_count': 0, 'completions_count': 0})
+        self.assertEqual(other.get_course_stats(),
+                         {'members_count': 0, 'contents_count': 2, 'comments_count': 1, 'completions_count': 1})
+        self.assertEqual({hit['id'] for hit in search.query("bab", course_id=other.id)}, {self.content.id, child.id})
+        self.assertEqual(search.query("mantap", course_id=other.id)[0]['id'], self.comment.id)
+        self.assertEqual(search.query("bab", course_id=self.course.id), [])
+
+    def test_members_count_is_the_enrolled_count(self):
+        # a bulk insert skips both the seat claim and the signals
+        CourseMember.objects.bulk_create([CourseMember(course_id=self.course, user_id=self.teacher, roles='ast')])
+        call_command('reconcile_enrollment', stdout=StringIO())
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.get_course_stats()['members_count'], 2)
+        response = self.client.get(f'/api/v1/async/courses/{self.course.id}/analytics')
+        self.assertEqual(response.json()['members_count'], 2)
+
+    def test_dashboards_read_one_row(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/course_analytics/{self.course.id}/')
+        self.assertEqual(response.json()['comments_count'], 1)
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/user_activity/{self.student.id}/')
+        self.assertEqual(response.json()['contents_completed'], 1)
+
+    def test_rebuild_after_bulk_writes(self):
+        CourseContent.objects.bulk_create(
+            CourseContent(course_id=self.course, name=f"Bab {num}", description="") for num in range(2, 5))
+        UserStats.objects.all().delete()
+        call_command('rebuild_stats', stdout=StringIO())
+        self.assertEqual(CourseStats.objects.get(course=self.course).contents, 4)
+        self.assertEqual(self.student.get_course_stats()['comments_written'], 1)
+        self.assertEqual(UserStats.objects.count(), 2)
@@ -1,7 +1,10 @@
+import csv
 import json
-from sqlite3 import IntegrityError
 from django.shortcuts import render, HttpResponse, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
 from django.core.exceptions import ObjectDoesNotExist,ValidationError
 from django.core import serializers
 from django.utils import timezone
@@ -10,7 +13,11 @@ from django.contrib.auth.models import User
 from django.views.decorators.csrf import csrf_exempt
 from django import forms
 
-from lms_core.models import Course, Comment, CourseContent, CourseMember, Announcement, Category
+from lms_core.models import Course, Comment, CourseContent, CourseMember, Announcement, Category, ContentCompletion
+from lms_core.responsecache import cached, course_scope
+from lms_core.enrollment import COURSE_FULL, ENROLLED, enroll_users
+from lms_core.pagination import KeysetPagination, encode_cursor
+from ninja.errors import HttpError
 
 def index(request):
     return HttpResponse("<h1>Hello World</h1>")
@@ -20,6 +27,69 @@ def testing(request):
     dataCourse = serializers.serialize("python", dataCourse)
     return JsonResponse(dataCourse, safe=False)
 
+EXPORT_CHUNK_SIZE = 2000
+
+# output column -> lookup, foreign keys are flattened by the values() projection
+EXPORTS = {
+    'courses': (Course, {
+        'id': 'id', 'name': 'name', 'description': 'description', 'price': 'price',
+        'teacher_id': 'teacher_id', 'teacher_username': 'teacher__username', 'category_name': 'category__name',
+        'max_students': 'max_students', 'created_at': 'created_at', 'updated_at': 'updated_at',
+    }),
+    'members': (CourseMember, {
+        'id': 'id', 'course_id': 'course_id', 'course_name': 'course_id__name',
+        'user_id': 'user_id', 'username': 'user_id__username', 'roles': 'roles', 'created_at': 'created_at',
+    }),
+    'contents': (CourseContent, {
+        'id': 'id', 'course_id': 'course_id', 'parent_id': 'parent_id', 'name': 'name',
+        'description': 'description', 'scheduled_start_time': 'scheduled_start_time',
+        'scheduled_end_time': 'scheduled_end_time', 'created_at': 'created_at', 'updated_at': 'updated_at',
+    }),
+    'comments': (Comment, {
+        'id': 'id', 'content_id': 'content_id', 'course_id': 'content_id__course_id',
+        'user_id': 'member_id__user_id', 'username': 'member_id__user_id__username', 'comment': 'comment',
+        'is_approved': 'is_approved', 'created_at': 'created_at',
+    }),
+    'completions': (ContentCompletion, {
+        'id': 'id', 'content_id': 'content_id', 'course_id': 'course_id',
+        'user_id': 'user_id', 'username': 'user__username', 'completed_at': 'completed_at',
+    }),
+}
+
+class Echo:
+    def write(self, value):
+        return value
+
+def export_data(request, table):
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Only staff can export data"}, status=403)
+    if table not in EXPORTS:
+        return JsonResponse({"error": f"Unknown table {table}"}, status=404)
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return JsonResponse({"error": "format must be ndjson or csv"}, status=400)
+
+    model, columns = EXPORTS[table]
+    # iterator() reads through a server-side cursor on PostgreSQL, chunk by chunk
+    rows = (model.objects.order_by('id')
+            .values(*[name for name, lookup in columns.items() if name == lookup],
+                    **{name: F(lookup) for name, lookup in columns.items() if name != lookup})
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE))
+
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        lines = (writer.writerow(row[name] for name in columns) for row in rows)
+        response = StreamingHttpResponse(_with_header(writer.writerow(columns), lines), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{table}.csv"'
+    else:
+        lines = (json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in rows)
+        response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+    return response
+
+def _with_header(header, lines):
+    yield header
+    yield from lines
+
 def addData(request): 
     course = Course(
         name = "Belajar Django",
@@ -64,14 +134,25 @@ def register(request):
 
     return JsonResponse({"error": "Invalid request method"}, status=405)
 
+COMMENTS_PAGE_SIZE = 50
+
 def list_comments(request, content_id):
-    comments = Comment.objects.filter(content_id=content_id, is_approved=True)
-    
-    if not comments.exists():
+    # newest first, one page at a time; X-Next-Cursor hands out the following page
+    comments = Comment.objects.filter(content_id=content_id, is_approved=True).order_by('-created_at', '-id')
+    cursor = request.GET.get('cursor')
+    try:
+        comments = list(KeysetPagination().after(comments, cursor)[:COMMENTS_PAGE_SIZE + 1])
+    except HttpError as e:
+        return JsonResponse({"error": e.message}, status=e.status_code)
+
+    if not comments and not cursor:
         return JsonResponse({"message": "No approved comments found for this content."}, status=404)
     
-    data = serializers.serialize("json", comments)
-    return JsonResponse(data, safe=False)
+    data = serializers.serialize("json", comments[:COMMENTS_PAGE_SIZE])
+    response = JsonResponse(data, safe=False)
+    if len(comments) > COMMENTS_PAGE_SIZE:
+        response['X-Next-Cursor'] = encode_cursor(comments[COMMENTS_PAGE_SIZE - 1])
+    return response
 
 @csrf_exempt
 def moderate_comment(request, content_id, comment_id):
@@ -104,20 +185,27 @@ def course_analytics(request, course_id):
     stats = course.get_course_stats()
     return JsonResponse(stats)
 
+@cached(course_scope, timeout=lambda request, course_id: CourseContent.seconds_to_next_change(course_id))
 def list_course_contents(request, course_id):
-    contents = CourseContent.objects.filter(course_id=course_id, scheduled_start_time__lte=timezone.now())
-    
+    now = timezone.now()
+    # started contents, flagged open or closed by the database; one query on content_schedule_idx
+    contents = CourseContent.objects.filter(course_id=course_id) \
+        .filter(Q(scheduled_start_time__isnull=True) | Q(scheduled_start_time__lte=now)) \
+        .annotate(is_available=ExpressionWrapper(CourseContent.available_at(now), output_field=BooleanField())) \
+        .values('id', 'name', 'description', 'scheduled_start_time', 'scheduled_end_time', 'is_available',
+                'course_id', course_name=F('course_id__name'))
+
     data = [
         {
-            "id": content.id,
-            "name": content.name,
-            "description": content.description,
-            "scheduled_start_time": content.scheduled_start_time,
-            "scheduled_end_time": content.scheduled_end_time,
-            "is_available": content.is_available(),  
+            "id": content['id'],
+            "name": content['name'],
+            "description": content['description'],
+            "scheduled_start_time": content['scheduled_start_time'],
+            "scheduled_end_time": content['scheduled_end_time'],
+            "is_available": content['is_available'],
             "course": {
-                "id": content.course_id.id,
-                "name": content.course_id.name,
+                "id": content['course_id'],
+                "name": content['course_name'],
             },
         }
         for content in contents
@@ -135,13 +223,17 @@ def batch_enroll(request):
         if form.is_valid():
             course = form.cleaned_data['course']
             students = form.cleaned_data['students']
-            if CourseMember.objects.filter(course_id=course).count() + len(students) > course.max_students:
-                messages.error(request, "Not enough slots available for all students")
-                return redirect('batch_enroll')
-            for student in students:
-                if not CourseMember.objects.filter(course_id=course, user_id=student).exists():
-                    CourseMember.objects.create(course_id=course, user_id=student)
-            messages.success(request, "Students enrolled successfully")
+            # enroll_users claims the free seats under the course lock, members already
+            # enrolled do not take one
+            _, results = enroll_users(course.id, [student.id for student in students])
+            enrolled = sum(status == ENROLLED for _, status in results)
+            full = sum(status == COURSE_FULL for _, status in results)
+            if enrolled:
+                messages.success(request, f"{enrolled} students enrolled successfully")
+            if full:
+                messages.warning(request, f"{full} students were not enrolled, the course is full")
+            if not enrolled and not full:
+                messages.info(request, "The selected students were already enrolled")
             return redirect('admin:index')
     else:
         form = BatchEnrollForm()
@@ -168,24 +260,17 @@ def enroll_student(request):
             except ObjectDoesNotExist:
                 return JsonResponse({"error": f"User with id {user_id} does not exist"}, status=404)
 
-            if CourseMember.objects.filter(course_id=course, user_id=user).exists():
+            try:
+                CourseMember.objects.create(course_id=course, user_id=user)
+            except ValidationError:
+                return JsonResponse({"error": "Course is full"}, status=400)
+            except IntegrityError:
                 return JsonResponse({"error": "Student is already enrolled in this course"}, status=400)
-
-            max_students = course.max_students
-            if max_students is not None: 
-                enrolled_count = CourseMember.objects.filter(course_id=course).count()
-                if enrolled_count >= max_students:
-                    return JsonResponse({"error": "Course is full"}, status=400)
-
-            CourseMember.objects.create(course_id=course, user_id=user)
             return JsonResponse({"message": "Student enrolled successfully"}, status=201)
 
         except json.JSONDecodeError:
             return JsonResponse({"error": "Invalid JSON data"}, status=400)
         
-        except IntegrityError as e:
-            return JsonResponse({"error": f"Database error: {str(e)}"}, status=500)
-        
     return JsonResponse({"error": "Invalid request method"}, status=405)
 
 @csrf_exempt
@@ -219,10 +304,11 @@ def create_announcement(request, course_id):
             return JsonResponse({"error": "Invalid JSON data"}, status=400)
     return JsonResponse({"error": "Invalid request method"}, status=405)
 
+@cached(course_scope, timeout=lambda request, course_id: Announcement.seconds_to_next_change(course_id))
 def show_announcements(request, course_id):
     course = get_object_or_404(Course, id=course_id)
 
-    announcements = Announcement.objects.filter(course=course)
+    announcements = Announcement.active(course.id, timezone.now())
     active_announcements = [
         {
             "id": announcement.id,
@@ -230,9 +316,9 @@ def show_announcements(request, course_id):
             "content": announcement.content,
             "start_date": announcement.start_date,
             "end_date": announcement.end_date,
-            "is_active": announcement.is_active(),
+            "is_active": True,
         }
-        for announcement in announcements if announcement.is_active()
+        for announcement in announcements
     ]
     return JsonResponse(active_announcements, safe=False)
 
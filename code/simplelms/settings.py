@@ -82,6 +82,33 @@ DATABASES = {
 }
 
 
+# Cache
+# Responses of the public reads are cached in the 'responses' alias, switch it
+# to FileBasedCache (or any other backend) in local_settings.py
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+RESPONSE_CACHE_ALIAS = 'responses'
+# seconds a cached response lives when its view gives no timeout of its own
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Completion events are queued per process and written in batches by
+# lms_core.completions; COMPLETION_FLUSH_SECONDS = 0 writes every request through
+
+COMPLETION_BUFFER_SIZE = 500
+COMPLETION_FLUSH_SECONDS = 1.0
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -15,7 +15,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.urls import path
-from lms_core.views import index, testing, addData, editData, deleteData, register, list_comments, user_activity_dashboard, course_analytics, list_course_contents, batch_enroll, moderate_comment, enroll_student, create_announcement, show_announcements, edit_announcement, delete_announcement, create_category, show_category, delete_category
+from lms_core.views import index, testing, addData, editData, deleteData, register, list_comments, user_activity_dashboard, course_analytics, list_course_contents, batch_enroll, moderate_comment, enroll_student, create_announcement, show_announcements, edit_announcement, delete_announcement, create_category, show_category, delete_category, export_data
 from lms_core.api import apiv1
 from lms_core.admin import admin_site
 
@@ -41,6 +41,7 @@ urlpatterns = [
     path('category/create/', create_category, name='create_category'),
     path('category/show/', show_category, name='show_category'),
     path('category/<int:category_id>/delete/', delete_category, name='delete_category'),
+    path('export/<str:table>/', export_data, name='export_data'),
 
 
     path('', index),